@@ -39,7 +39,11 @@ from ..services.mbom_operacion_service import (
     obtener_siguiente_secuencia,
 )
 from ..services.mbom_service import listar_producto_padre_ids_con_estructura_con_datos
-from ..services.producto_service import crear_producto, listar_productos
+from ..services.producto_service import (
+    crear_producto,
+    invalidar_cache_productos,
+    listar_productos,
+)
 from ..services.ruta_operacion_base_service import (
     aplicar_ruta_base_a_mbom,
     crear_ruta_base_desde_mbom,
@@ -574,6 +578,7 @@ def api_corregir_tipos_productos_30(db: Session = Depends(get_db)):
             )
         )
         db.commit()
+        invalidar_cache_productos()
 
         count = db.execute(
             text(
@@ -613,14 +618,33 @@ def api_listar_rutas_base_endpoint(
     ),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    after_nombre: Optional[str] = Query(
+        None,
+        description="Cursor: nombre de la última fila",
+    ),
+    after_id: Optional[int] = Query(
+        None,
+        description="Cursor: id de la última fila",
+    ),
     db: Session = Depends(get_db),
 ):
+    if (after_nombre is None) != (after_id is None):
+        raise HTTPException(
+            status_code=400,
+            detail="after_nombre y after_id deben informarse juntos",
+        )
+    after = (
+        (after_nombre, after_id)
+        if after_nombre is not None and after_id is not None
+        else None
+    )
     return listar_rutas_base(
         db=db,
         q=q,
         solo_activas=solo_activas,
         limit=limit,
         offset=offset,
+        after=after,
     )
 
 
@@ -57,9 +57,25 @@ def api_historial_precios(
     hasta: Optional[date] = Query(default=None),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    after_fecha: Optional[date] = Query(
+        default=None, description="Cursor: fecha_precio de la última fila"
+    ),
+    after_id: Optional[int] = Query(
+        default=None, description="Cursor: id de la última fila"
+    ),
     db: Session = Depends(get_db),
     _current_user=Depends(require_permission("precios", False)),
 ):
+    if (after_fecha is None) != (after_id is None):
+        raise HTTPException(
+            status_code=400,
+            detail="after_fecha y after_id deben informarse juntos",
+        )
+    after = (
+        (after_fecha, after_id)
+        if after_fecha is not None and after_id is not None
+        else None
+    )
     try:
         return listar_precios_compra(
             db,
@@ -70,6 +86,7 @@ def api_historial_precios(
             hasta=hasta,
             limit=limit,
             offset=offset,
+            after=after,
         )
     except SQLAlchemyError as ex:
         raise HTTPException(
@@ -1,6 +1,14 @@
 from typing import List
 import io
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    UploadFile,
+)
 from fastapi.responses import StreamingResponse
 from sqlalchemy import text
 from sqlalchemy.orm import Session
@@ -175,6 +183,13 @@ def listar_stock(
     anio: int,
     mes: int,
     q: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=5000),
+    after_codigo: str | None = Query(
+        default=None, description="Cursor: producto_codigo de la última fila"
+    ),
+    after_id: int | None = Query(
+        default=None, description="Cursor: id de la última fila"
+    ),
     db: Session = Depends(get_db),
 ):
     if not (1 <= mes <= 12):
@@ -182,7 +197,17 @@ def listar_stock(
             status_code=400,
             detail="mes debe estar entre 1 y 12"
         )
-    return listar_stock_periodo(db, anio, mes, q)
+    if (after_codigo is None) != (after_id is None):
+        raise HTTPException(
+            status_code=400,
+            detail="after_codigo y after_id deben informarse juntos",
+        )
+    after = (
+        (after_codigo, after_id)
+        if after_codigo is not None and after_id is not None
+        else None
+    )
+    return listar_stock_periodo(db, anio, mes, q, limit=limit, after=after)
 
 
 @router.get("/{anio}/{mes}/resumen")
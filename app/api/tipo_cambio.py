@@ -62,12 +62,30 @@ def api_listar_tipos_cambio(
     hasta: str | None = Query(
         default=None, description="Fecha hasta (YYYY-MM-DD)"
     ),
+    limit: int = Query(default=500, ge=1, le=5000),
+    cursor_fecha: date | None = Query(
+        default=None, description="Cursor: fecha de la última fila"
+    ),
+    cursor_id: int | None = Query(
+        default=None, description="Cursor: id de la última fila"
+    ),
     db: Session = Depends(get_db),
 ):
+    if (cursor_fecha is None) != (cursor_id is None):
+        raise HTTPException(
+            status_code=400,
+            detail="cursor_fecha y cursor_id deben informarse juntos",
+        )
     desde_dt = date.fromisoformat(desde) if desde else None
     hasta_dt = date.fromisoformat(hasta) if hasta else None
     filtro = TipoCambioFiltro(
-        moneda=moneda, tipo=tipo, desde=desde_dt, hasta=hasta_dt
+        moneda=moneda,
+        tipo=tipo,
+        desde=desde_dt,
+        hasta=hasta_dt,
+        limit=limit,
+        cursor_fecha=cursor_fecha,
+        cursor_id=cursor_id,
     )
     try:
         return listar_tipos_cambio(db, filtro)
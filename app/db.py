@@ -6,6 +6,10 @@ from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from .core.config import get_settings
 
 _settings = get_settings()
+# Driver PyMySQL: fast_executemany (pyodbc) y executemany_mode (psycopg2) no
+# aplican. Con executemany sobre text(), PyMySQL ya pliega los INSERT ...
+# VALUES en sentencias multi-fila; insertmanyvalues solo afecta a insert()
+# de Core/ORM con RETURNING, que MySQL no soporta.
 _engine = create_engine(
     _settings.database_url,
     pool_pre_ping=True,
@@ -57,6 +57,10 @@ class TipoCambioFiltro(BaseModel):
     tipo: Optional[str] = None
     desde: Optional[date] = None
     hasta: Optional[date] = None
+    limit: int = Field(500, ge=1, le=5000)
+    # Cursor keyset: (fecha, id) de la última fila de la página anterior
+    cursor_fecha: Optional[date] = None
+    cursor_id: Optional[int] = None
 
 
 class BulkImportResult(BaseModel):
@@ -1,6 +1,7 @@
 """Clientes para obtener tipos de cambio oficiales."""
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import date
 from typing import Iterable, List, Optional
@@ -111,8 +112,17 @@ class BcraFxProvider:
         if desde > hasta:
             raise ValueError("La fecha 'desde' no puede ser mayor a 'hasta'")
         resultados: List[FxRate] = []
-        for serie in self._SERIES_DEF:
-            items = self._request_series(serie["endpoint"])
+        # Las series son independientes: se piden en paralelo (I/O puro).
+        # El cliente se crea antes para no inicializarlo desde dos hilos.
+        self._http_client()
+        with ThreadPoolExecutor(max_workers=len(self._SERIES_DEF)) as pool:
+            respuestas = list(
+                pool.map(
+                    lambda serie: self._request_series(serie["endpoint"]),
+                    self._SERIES_DEF,
+                )
+            )
+        for serie, items in zip(self._SERIES_DEF, respuestas):
             for item in items:
                 rate = self._map_item(
                     item,
@@ -280,6 +280,10 @@ def _parse_content(filename: str, content: bytes) -> List[Dict[str, object]]:
     return _parse_csv(content)
 
 
+class _ExcelPuntoYComa(csv.excel):
+    delimiter = ";"
+
+
 def _parse_csv(content: bytes) -> List[Dict[str, object]]:
     try:
         decoded = content.decode("utf-8-sig")
@@ -298,19 +302,15 @@ def _parse_csv(content: bytes) -> List[Dict[str, object]]:
     try:
         dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
     except csv.Error:
-        dialect = csv.excel
-        dialect.delimiter = ";"
-    reader = csv.DictReader(stream, dialect=dialect)
-    rows: List[Dict[str, object]] = []
-    for row in reader:
-        cleaned: Dict[str, object] = {
-            (k.strip() if isinstance(k, str) else k): (
-                v.strip() if isinstance(v, str) else v
-            )
-            for k, v in row.items()
-        }
-        rows.append(cleaned)
-    return rows
+        dialect = _ExcelPuntoYComa
+    # Encabezados limpiados una sola vez; por fila solo se limpian valores.
+    reader = csv.reader(stream, dialect=dialect)
+    headers = [h.strip() for h in next(reader, [])]
+    return [
+        dict(zip(headers, map(str.strip, values)))
+        for values in reader
+        if values  # DictReader también omitía las líneas en blanco
+    ]
 
 
 def _parse_xlsx(content: bytes) -> List[Dict[str, object]]:
@@ -1,16 +1,81 @@
 import csv
+import functools
 import io
+import itertools
 import logging
 import re
+import string
+import sys
+from dataclasses import dataclass, fields
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from fastapi import HTTPException, UploadFile
 from openpyxl import Workbook, load_workbook
-from sqlalchemy import text
+from sqlalchemy import and_, bindparam, column, or_, select, table, text
 from sqlalchemy.orm import Session
 
 from ..schemas.precio import PrecioImportResult
+from ..utils.collation import clave_collation
+
+_PRECIO_HIST = table(
+    "precio_compra_hist",
+    column("id"),
+    column("producto_id"),
+    column("proveedor_codigo"),
+    column("proveedor_nombre"),
+    column("fecha_precio"),
+    column("precio_unitario"),
+    column("moneda"),
+    column("origen"),
+    column("referencia_doc"),
+    column("notas"),
+)
+_PRODUCTO = table("producto", column("id"), column("codigo"), column("nombre"))
+
+SQL_GET_PRODUCTO_ID = text("SELECT id FROM producto WHERE codigo = :codigo")
+SQL_PRODUCTO_IDS = text("SELECT codigo, id FROM producto")
+SQL_LOOKUP_PRECIO_EXISTS = text(
+    "SELECT id FROM precio_compra_hist "
+    "WHERE producto_id=:pid AND proveedor_codigo=:prov "
+    "AND fecha_precio=:fecha AND moneda=:moneda"
+)
+SQL_LOOKUP_PRECIOS_LOTE = text(
+    "SELECT id, producto_id, proveedor_codigo, fecha_precio, moneda "
+    "FROM precio_compra_hist "
+    "WHERE producto_id IN :pids AND fecha_precio IN :fechas"
+).bindparams(
+    bindparam("pids", expanding=True),
+    bindparam("fechas", expanding=True),
+)
+# Sentencias DBAPI (paramstyle %s de PyMySQL) para el camino masivo:
+# cursor.executemany reescribe el INSERT como un único VALUES multi-fila.
+RAW_INSERT_PRECIO = (
+    "INSERT INTO precio_compra_hist "
+    "(producto_id, proveedor_codigo, proveedor_nombre, "
+    "fecha_precio, precio_unitario, moneda, origen, "
+    "referencia_doc, notas) VALUES "
+    "(%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+RAW_UPDATE_PRECIO = (
+    "UPDATE precio_compra_hist SET "
+    "precio_unitario=%s, proveedor_nombre=%s, "
+    "origen=%s, referencia_doc=%s, notas=%s "
+    "WHERE id=%s"
+)
+IMPORT_BATCH_SIZE = 1000
+SQL_GET_PRECIO = text(
+    """
+    SELECT h.id, h.producto_id, h.proveedor_codigo, h.proveedor_nombre,
+           h.fecha_precio, h.precio_unitario, h.moneda, h.origen,
+           h.referencia_doc, h.notas,
+           p.codigo AS producto_codigo, p.nombre AS producto_nombre
+    FROM precio_compra_hist h
+    JOIN producto p ON p.id = h.producto_id
+    WHERE h.id = :id
+    LIMIT 1
+    """
+)
 
 
 def _row_to_precio(row: Any) -> Dict[str, Any]:
@@ -41,51 +106,72 @@ def listar_precios_compra(
     hasta: Optional[date] = None,
     limit: int = 50,
     offset: int = 0,
+    after: Optional[Tuple[date, int]] = None,
 ) -> List[Dict[str, Any]]:
-    where = ["1=1"]
-    params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    """Lista el historial de precios ordenado por fecha desc.
+
+    ``after`` es un cursor ``(fecha_precio, id)`` tomado de la última fila
+    de la página anterior; cuando se informa, se ignora ``offset``.
+    """
+    # select() de Core: SQLAlchemy cachea la compilación por estructura,
+    # así cada combinación de filtros reutiliza su sentencia compilada.
+    h, p = _PRECIO_HIST, _PRODUCTO
+    stmt = select(
+        h.c.id,
+        h.c.producto_id,
+        h.c.proveedor_codigo,
+        h.c.proveedor_nombre,
+        h.c.fecha_precio,
+        h.c.precio_unitario,
+        h.c.moneda,
+        h.c.origen,
+        h.c.referencia_doc,
+        h.c.notas,
+        p.c.codigo.label("producto_codigo"),
+        p.c.nombre.label("producto_nombre"),
+    ).select_from(h.join(p, p.c.id == h.c.producto_id))
 
     if producto_id is not None:
-        where.append("h.producto_id = :pid")
-        params["pid"] = producto_id
-
+        stmt = stmt.where(h.c.producto_id == producto_id)
     if q:
-        where.append(
-            "(p.codigo LIKE :q OR p.nombre LIKE :q"
-            " OR h.proveedor_codigo LIKE :q"
-            " OR h.proveedor_nombre LIKE :q)"
+        qpat = f"%{q}%"
+        stmt = stmt.where(
+            or_(
+                p.c.codigo.like(qpat),
+                p.c.nombre.like(qpat),
+                h.c.proveedor_codigo.like(qpat),
+                h.c.proveedor_nombre.like(qpat),
+            )
         )
-        params["q"] = f"%{q}%"
-
     if proveedor:
-        where.append(
-            "(h.proveedor_codigo LIKE :prov OR h.proveedor_nombre LIKE :prov)"
+        prov_pat = f"%{proveedor}%"
+        stmt = stmt.where(
+            or_(
+                h.c.proveedor_codigo.like(prov_pat),
+                h.c.proveedor_nombre.like(prov_pat),
+            )
         )
-        params["prov"] = f"%{proveedor}%"
-
     if desde is not None:
-        where.append("h.fecha_precio >= :desde")
-        params["desde"] = desde
-
+        stmt = stmt.where(h.c.fecha_precio >= desde)
     if hasta is not None:
-        where.append("h.fecha_precio <= :hasta")
-        params["hasta"] = hasta
-
-    sql = text(
-        """
-        SELECT h.id, h.producto_id, h.proveedor_codigo, h.proveedor_nombre,
-               h.fecha_precio, h.precio_unitario, h.moneda, h.origen,
-               h.referencia_doc, h.notas,
-               p.codigo AS producto_codigo, p.nombre AS producto_nombre
-        FROM precio_compra_hist h
-        JOIN producto p ON p.id = h.producto_id
-        WHERE """
-        + " AND ".join(where)
-        + " ORDER BY h.fecha_precio DESC, h.id DESC"
-        + " LIMIT :limit OFFSET :offset"
-    )
+        stmt = stmt.where(h.c.fecha_precio <= hasta)
+    if after is not None:
+        # Keyset: usa ix_pch_fecha_id en lugar de descartar OFFSET filas.
+        cursor_fecha, cursor_id = after
+        stmt = stmt.where(
+            or_(
+                h.c.fecha_precio < cursor_fecha,
+                and_(h.c.fecha_precio == cursor_fecha, h.c.id < cursor_id),
+            )
+        )
+        offset = 0
 
-    rows = db.execute(sql, params).fetchall()
+    stmt = (
+        stmt.order_by(h.c.fecha_precio.desc(), h.c.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    rows = db.execute(stmt).fetchall()
     return [_row_to_precio(r) for r in rows]
 
 
@@ -129,11 +215,7 @@ def crear_precio_compra_manual(
     notas_value = (notas or "").strip() or None
 
     existing = db.execute(
-        text(
-            "SELECT id FROM precio_compra_hist "
-            "WHERE producto_id=:pid AND proveedor_codigo=:prov "
-            "AND fecha_precio=:fecha AND moneda=:moneda"
-        ),
+        SQL_LOOKUP_PRECIO_EXISTS,
         {
             "pid": producto_id,
             "prov": proveedor_codigo_value,
@@ -182,21 +264,7 @@ def crear_precio_compra_manual(
 
     db.commit()
 
-    row = db.execute(
-        text(
-            """
-            SELECT h.id, h.producto_id, h.proveedor_codigo, h.proveedor_nombre,
-                   h.fecha_precio, h.precio_unitario, h.moneda, h.origen,
-                   h.referencia_doc, h.notas,
-                   p.codigo AS producto_codigo, p.nombre AS producto_nombre
-            FROM precio_compra_hist h
-            JOIN producto p ON p.id = h.producto_id
-            WHERE h.id = :id
-            LIMIT 1
-            """
-        ),
-        {"id": target_id},
-    ).first()
+    row = db.execute(SQL_GET_PRECIO, {"id": target_id}).first()
     if not row:
         raise ValueError("No se pudo recuperar el precio guardado")
     return _row_to_precio(row)
@@ -221,34 +289,57 @@ CURRENCY_ALIASES = {
     "DOLAR MAYORISTA": "USD_MAY",
     "USD MAYORISTA": "USD_MAY",
 }
+_CURRENCY_KEEP = frozenset(string.ascii_uppercase + string.digits + " ")
+_CURRENCY_STRIP_TABLE = str.maketrans(
+    "", "", "".join(chr(i) for i in range(128) if chr(i) not in _CURRENCY_KEEP)
+)
 ALLOWED_ORIGENES = {"ERP_FLEXXUS", "MANUAL", "OTRO"}
 DEFAULT_PROVEEDOR_CODIGO = "PROV_GENERICO"
 DEFAULT_PROVEEDOR_NOMBRE = "Proveedor Genérico"
 DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%Y%m%d")
+# Ordenados por frecuencia observada en exportaciones para cortar antes.
 DATETIME_FORMATS = (
     "%d/%m/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
     "%d/%m/%Y %H:%M",
     "%d/%m/%Y %I:%M:%S %p",
     "%d/%m/%Y %I:%M %p",
-    "%Y-%m-%d %H:%M:%S",
 )
+_AMPM_RE = re.compile(r"(?i)\b([ap])\.?\s*m\.?\b")
+# Camino rápido para las formas de DATE_FORMATS/DATETIME_FORMATS ISO y
+# dd/mm/aaaa; el resto cae en el bucle de strptime.
+_ISO_DATE_RE = re.compile(
+    r"^(\d{4})-(\d{1,2})-(\d{1,2})(?: (\d{1,2}):(\d{1,2}):(\d{1,2}))?$"
+)
+_DMY_DATE_RE = re.compile(
+    r"^(\d{1,2})/(\d{1,2})/(\d{4})"
+    r"(?: (\d{1,2}):(\d{1,2})(?::(\d{1,2}))?(?: ([AP]M))?)?$"
+)
+
+
+def _ampm_upper(match: "re.Match[str]") -> str:
+    return match.group(1).upper() + "M"
 
 
 def _normalize_datetime_text(raw: str) -> str:
     normalized = raw.replace("\xa0", " ").strip()
     normalized = " ".join(normalized.split())
-    return re.sub(
-        r"(?i)\b([ap])\.?\s*m\.?\b",
-        lambda match: match.group(1).upper() + "M",
-        normalized,
-    )
+    if "m" not in normalized and "M" not in normalized:
+        # Sin "m" no hay sufijo a.m./p.m. que normalizar.
+        return normalized
+    return _AMPM_RE.sub(_ampm_upper, normalized)
 
 
 def _sanitize_currency_key(raw: str) -> str:
+    if raw in CURRENCY_ALIASES:
+        return raw
     cleaned = raw.replace("\xa0", " ").strip().upper()
     cleaned = cleaned.replace("_", " ")
     cleaned = " ".join(cleaned.split())
-    return re.sub(r"[^A-Z0-9 ]+", "", cleaned)
+    # Equivale a re.sub(r"[^A-Z0-9 ]+", "", ...) pero sin pasar por regex.
+    if not cleaned.isascii():
+        cleaned = cleaned.encode("ascii", "ignore").decode("ascii")
+    return cleaned.translate(_CURRENCY_STRIP_TABLE)
 
 
 def _normalize_moneda_value(
@@ -265,19 +356,31 @@ def _normalize_moneda_value(
     return mapped if mapped in ALLOWED_MONEDAS else None
 
 
-def _parse_fecha_precio(value: Any) -> Optional[date]:
-    if value is None:
-        return None
-    if isinstance(value, date) and not isinstance(value, datetime):
-        return value
-    if isinstance(value, datetime):
-        return value.date()
-    raw_text = str(value).strip()
-    if not raw_text:
-        return None
+@functools.lru_cache(maxsize=4096)
+def _parse_fecha_precio_str(raw_text: str) -> Optional[date]:
     cleaned = _normalize_datetime_text(raw_text)
     if not cleaned:
         return None
+    match = _ISO_DATE_RE.match(cleaned)
+    if match:
+        y, m, d, hh, mm, ss = match.groups()
+        meridian = None
+    else:
+        match = _DMY_DATE_RE.match(cleaned)
+        if match:
+            d, m, y, hh, mm, ss, meridian = match.groups()
+    if match:
+        # La hora no se usa, pero se valida como lo hacía strptime.
+        if hh is not None:
+            h = int(hh)
+            if not (1 <= h <= 12 if meridian else h <= 23):
+                return None
+            if int(mm) > 59 or int(ss or 0) > 59:
+                return None
+        try:
+            return date(int(y), int(m), int(d))
+        except ValueError:
+            return None
     for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(cleaned, fmt).date()
@@ -291,6 +394,20 @@ def _parse_fecha_precio(value: Any) -> Optional[date]:
     return None
 
 
+def _parse_fecha_precio(value: Any) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    raw_text = str(value).strip()
+    if not raw_text:
+        return None
+    # Las planillas repiten la misma fecha en muchas filas: se memoiza.
+    return _parse_fecha_precio_str(raw_text)
+
+
 def _decode_csv_content(content: bytes) -> str:
     if not content:
         raise HTTPException(status_code=400, detail="Archivo vacío")
@@ -306,20 +423,15 @@ def _decode_csv_content(content: bytes) -> str:
             ) from exc
 
 
-def _normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
-    normalized: Dict[str, Any] = {}
-    for key, value in row.items():
-        if key is None:
-            continue
-        norm_key = str(key).strip().lower()
-        if isinstance(value, str):
-            normalized[norm_key] = value.strip()
-        else:
-            normalized[norm_key] = value
-    return normalized
+def _strip_value(value: Any) -> Any:
+    return value.strip() if isinstance(value, str) else value
+
+
+ParsedRows = Tuple[List[str], Iterator[Dict[str, Any]]]
 
 
-def _parse_csv_rows(content: bytes) -> List[Dict[str, Any]]:
+def _parse_csv_rows(content: bytes) -> ParsedRows:
+    """Devuelve ``(headers, filas)``; las filas se generan bajo demanda."""
     decoded = _decode_csv_content(content)
     text_stream = io.StringIO(decoded)
     sample = text_stream.read(2048)
@@ -331,11 +443,22 @@ def _parse_csv_rows(content: bytes) -> List[Dict[str, Any]]:
             status_code=400,
             detail=f"No se pudo detectar el formato del CSV: {exc}",
         ) from exc
-    reader = csv.DictReader(text_stream, dialect=dialect)
-    return [_normalize_row(row) for row in reader]
+    reader = csv.reader(text_stream, dialect=dialect)
+    header_row = next(reader, None)
+    if header_row is None:
+        return [], iter(())
+    headers = [sys.intern(h.strip().lower()) for h in header_row]
 
+    def _rows() -> Iterator[Dict[str, Any]]:
+        for row in reader:
+            if row:
+                yield dict(zip(headers, (v.strip() for v in row)))
 
-def _parse_xlsx_rows(content: bytes) -> List[Dict[str, Any]]:
+    return headers, _rows()
+
+
+def _parse_xlsx_rows(content: bytes) -> ParsedRows:
+    """Devuelve ``(headers, filas)``; las filas se generan bajo demanda."""
     try:
         wb = load_workbook(io.BytesIO(content), read_only=True)
     except Exception as exc:
@@ -344,26 +467,31 @@ def _parse_xlsx_rows(content: bytes) -> List[Dict[str, Any]]:
             detail=f"Archivo XLSX inválido: {exc}",
         ) from exc
     ws = wb.active
-    if ws is None:
-        return []
-    try:
-        headers = [
-            str(c.value).strip().lower() if c.value is not None else ""
-            for c in next(ws.iter_rows(min_row=1, max_row=1))
-        ]
-    except StopIteration:
-        return []
-    rows: List[Dict[str, Any]] = []
-    for r in ws.iter_rows(min_row=2, values_only=True):
-        row_dict: Dict[str, Any] = {}
-        for idx, cell in enumerate(r):
-            key = headers[idx] if idx < len(headers) else f"col_{idx}"
-            if isinstance(cell, str):
-                row_dict[key] = cell.strip()
-            else:
-                row_dict[key] = cell
-        rows.append(row_dict)
-    return rows
+    header_row = (
+        next(ws.iter_rows(min_row=1, max_row=1, values_only=True), None)
+        if ws is not None
+        else None
+    )
+    if ws is None or header_row is None:
+        wb.close()
+        return [], iter(())
+    # Claves internadas: todas las filas comparten el mismo objeto str.
+    headers = [sys.intern(str(c or "").strip().lower()) for c in header_row]
+
+    def _rows() -> Iterator[Dict[str, Any]]:
+        try:
+            for r in ws.iter_rows(min_row=2, values_only=True):
+                yield dict(zip(headers, (_strip_value(cell) for cell in r)))
+        finally:
+            wb.close()
+
+    return headers, _rows()
+
+
+def _prefetch_producto_ids(db: Session) -> Dict[str, Optional[int]]:
+    # Un solo SELECT del catálogo reemplaza la consulta por código en el
+    # bucle; los códigos que no matcheen exacto (collation) van al fallback.
+    return {str(r.codigo): int(r.id) for r in db.execute(SQL_PRODUCTO_IDS)}
 
 
 def _get_producto_id(
@@ -371,12 +499,94 @@ def _get_producto_id(
 ) -> Optional[int]:
     if codigo in cache:
         return cache[codigo]
-    res = db.execute(
-        text("SELECT id FROM producto WHERE codigo = :codigo"),
-        {"codigo": codigo},
-    ).first()
-    cache[codigo] = int(res[0]) if res else None
-    return cache[codigo]
+    # Sentencia de módulo: la compilación sale del caché de SQLAlchemy.
+    res = db.scalar(SQL_GET_PRODUCTO_ID, {"codigo": codigo})
+    prod_id = int(res) if res is not None else None
+    cache[codigo] = prod_id
+    return prod_id
+
+
+PrecioKey = Tuple[int, str, date, str]
+
+
+@dataclass(slots=True)
+class PrecioRow:
+    """Fila del archivo de precios con las columnas conocidas."""
+
+    producto_codigo: Any
+    proveedor_codigo: Any
+    proveedor_nombre: Any
+    fecha_precio: Any
+    precio_unitario: Any
+    moneda: Any
+    origen: Any
+    referencia_doc: Any
+    notas: Any
+
+
+_PRECIO_ROW_FIELDS = tuple(f.name for f in fields(PrecioRow))
+
+
+def _to_precio_row(row: Dict[str, Any]) -> PrecioRow:
+    # Un solo barrido por fila; el bucle de importación usa atributos.
+    return PrecioRow(*map(row.get, _PRECIO_ROW_FIELDS))
+
+
+def _precio_key(
+    producto_id: int, proveedor_codigo: str, fecha: date, moneda: str
+) -> PrecioKey:
+    # Dos filas que MySQL compara como iguales deben caer en la misma clave:
+    # si no, ambas irían al mismo executemany y los contadores se desfasan.
+    return (
+        producto_id,
+        clave_collation(str(proveedor_codigo)),
+        fecha,
+        clave_collation(str(moneda)),
+    )
+
+
+def _persistir_lote_precios(
+    db: Session, lote: Dict[PrecioKey, Tuple[Any, ...]]
+) -> Tuple[int, int]:
+    """Inserta/actualiza un lote validado con executemany del driver.
+
+    ``lote`` mapea la clave natural del precio a la tupla de columnas en el
+    orden de ``RAW_INSERT_PRECIO``. Devuelve ``(insertados, actualizados)``.
+    """
+    if not lote:
+        return 0, 0
+    existentes: Dict[PrecioKey, int] = {}
+    for r in db.execute(
+        SQL_LOOKUP_PRECIOS_LOTE,
+        {
+            "pids": sorted({key[0] for key in lote}),
+            "fechas": sorted({key[2] for key in lote}),
+        },
+    ):
+        key = _precio_key(
+            r.producto_id, r.proveedor_codigo, r.fecha_precio, r.moneda
+        )
+        existentes[key] = int(r.id)
+
+    to_insert: List[Tuple[Any, ...]] = []
+    to_update: List[Tuple[Any, ...]] = []
+    for key, values in lote.items():
+        existing_id = existentes.get(key)
+        if existing_id is None:
+            to_insert.append(values)
+        else:
+            _, _, prov_nom, _, precio, _, origen, ref, notas = values
+            to_update.append((precio, prov_nom, origen, ref, notas, existing_id))
+
+    cursor = db.connection().connection.cursor()
+    try:
+        if to_insert:
+            cursor.executemany(RAW_INSERT_PRECIO, to_insert)
+        if to_update:
+            cursor.executemany(RAW_UPDATE_PRECIO, to_update)
+    finally:
+        cursor.close()
+    return len(to_insert), len(to_update)
 
 
 def generar_template_precios() -> io.BytesIO:
@@ -426,16 +636,16 @@ def importar_precios_desde_archivo(
         raise HTTPException(status_code=400, detail="Archivo vacío")
 
     if filename.lower().endswith(".xlsx"):
-        rows = _parse_xlsx_rows(content)
+        headers, rows_iter = _parse_xlsx_rows(content)
     elif filename.lower().endswith(".csv") or filename == "":
-        rows = _parse_csv_rows(content)
+        headers, rows_iter = _parse_csv_rows(content)
     else:
         raise HTTPException(
             status_code=400,
             detail="Extensión no soportada (usar .csv o .xlsx)",
         )
 
-    if not rows:
+    if not headers:
         return PrecioImportResult(
             insertados=0,
             actualizados=0,
@@ -443,30 +653,39 @@ def importar_precios_desde_archivo(
             errores=["Archivo vacío"],
         )
 
+    # Se valida contra la cabecera, antes de leer filas de datos.
     required = {
         "producto_codigo",
         "fecha_precio",
         "precio_unitario",
         "moneda",
     }
-    missing = required - set(rows[0].keys())
+    missing = required - set(headers)
     if missing:
         raise HTTPException(
             status_code=400,
             detail=f"Faltan columnas requeridas: {', '.join(sorted(missing))}",
         )
 
+    first = next(rows_iter, None)
+    if first is None:
+        return PrecioImportResult(
+            insertados=0,
+            actualizados=0,
+            rechazados=0,
+            errores=["Archivo vacío"],
+        )
+
     insertados = actualizados = rechazados = 0
     errores: List[str] = []
-    cache: Dict[str, Optional[int]] = {}
+    cache = _prefetch_producto_ids(db)
+    rows = map(_to_precio_row, itertools.chain([first], rows_iter))
+    lote: Dict[PrecioKey, Tuple[Any, ...]] = {}
 
     try:
-        for idx, raw_row in enumerate(rows, start=2):
-            row = _normalize_row(raw_row)
-            codigo = row.get("producto_codigo", "") or ""
-            prov_codigo = (
-                row.get("proveedor_codigo", "") or DEFAULT_PROVEEDOR_CODIGO
-            )
+        for idx, row in enumerate(rows, start=2):
+            codigo = row.producto_codigo or ""
+            prov_codigo = row.proveedor_codigo or DEFAULT_PROVEEDOR_CODIGO
             if not codigo:
                 rechazados += 1
                 errores.append(f"Fila {idx}: producto_codigo vacío")
@@ -480,15 +699,21 @@ def importar_precios_desde_archivo(
                 )
                 continue
 
-            fecha_precio = _parse_fecha_precio(row.get("fecha_precio"))
+            fecha_precio = _parse_fecha_precio(row.fecha_precio)
             if not fecha_precio:
                 rechazados += 1
                 errores.append(f"Fila {idx}: fecha_precio inválida")
                 continue
 
-            precio_raw = row.get("precio_unitario")
+            precio_raw = row.precio_unitario
             try:
-                precio = float(str(precio_raw).replace(",", "."))
+                if isinstance(precio_raw, (int, float)) and not isinstance(
+                    precio_raw, bool
+                ):
+                    # XLSX entrega números nativos: sin str()/replace.
+                    precio = float(precio_raw)
+                else:
+                    precio = float(str(precio_raw).replace(",", "."))
                 if precio <= 0:
                     raise ValueError()
             except (ValueError, TypeError):
@@ -496,7 +721,7 @@ def importar_precios_desde_archivo(
                 errores.append(f"Fila {idx}: precio_unitario inválido")
                 continue
 
-            moneda_raw = row.get("moneda")
+            moneda_raw = row.moneda
             moneda = _normalize_moneda_value(moneda_raw, "ARS")
             if not moneda:
                 rechazados += 1
@@ -505,74 +730,43 @@ def importar_precios_desde_archivo(
                 )
                 continue
 
-            origen = (row.get("origen") or "MANUAL").upper()
+            origen = (row.origen or "MANUAL").upper()
             if origen not in ALLOWED_ORIGENES:
                 rechazados += 1
                 errores.append(f"Fila {idx}: origen inválido ({origen})")
                 continue
 
-            prov_nombre = (
-                row.get("proveedor_nombre") or DEFAULT_PROVEEDOR_NOMBRE
-            )
-            referencia = row.get("referencia_doc") or None
-            notas = row.get("notas") or None
-
-            existing = db.execute(
-                text(
-                    "SELECT id FROM precio_compra_hist "
-                    "WHERE producto_id=:pid AND proveedor_codigo=:prov "
-                    "AND fecha_precio=:fecha AND moneda=:moneda"
-                ),
-                {
-                    "pid": prod_id,
-                    "prov": prov_codigo,
-                    "fecha": fecha_precio,
-                    "moneda": moneda,
-                },
-            ).first()
-
-            if existing:
-                db.execute(
-                    text(
-                        "UPDATE precio_compra_hist SET "
-                        "precio_unitario=:precio, proveedor_nombre=:prov_nom, "
-                        "origen=:origen, referencia_doc=:ref, notas=:notas "
-                        "WHERE id=:id"
-                    ),
-                    {
-                        "precio": precio,
-                        "prov_nom": prov_nombre,
-                        "origen": origen,
-                        "ref": referencia,
-                        "notas": notas,
-                        "id": existing[0],
-                    },
-                )
-                actualizados += 1
-            else:
-                db.execute(
-                    text(
-                        "INSERT INTO precio_compra_hist "
-                        "(producto_id, proveedor_codigo, proveedor_nombre, "
-                        "fecha_precio, precio_unitario, moneda, origen, "
-                        "referencia_doc, notas) VALUES "
-                        "(:pid, :prov, :prov_nom, :fecha, :precio, :moneda, "
-                        ":origen, :ref, :notas)"
-                    ),
-                    {
-                        "pid": prod_id,
-                        "prov": prov_codigo,
-                        "prov_nom": prov_nombre,
-                        "fecha": fecha_precio,
-                        "precio": precio,
-                        "moneda": moneda,
-                        "origen": origen,
-                        "ref": referencia,
-                        "notas": notas,
-                    },
-                )
-                insertados += 1
+            prov_nombre = row.proveedor_nombre or DEFAULT_PROVEEDOR_NOMBRE
+            referencia = row.referencia_doc or None
+            notas = row.notas or None
 
+            key = _precio_key(prod_id, prov_codigo, fecha_precio, moneda)
+            if key in lote:
+                # Repetida dentro del lote: gana la última, como antes.
+                actualizados += 1
+            lote[key] = (
+                prod_id,
+                prov_codigo,
+                prov_nombre,
+                fecha_precio,
+                precio,
+                moneda,
+                origen,
+                referencia,
+                notas,
+            )
+            if len(lote) >= IMPORT_BATCH_SIZE:
+                # Los lotes acotan la memoria y el tamaño de cada
+                # executemany; la importación sigue siendo una sola
+                # transacción, todo o nada.
+                ins, upd = _persistir_lote_precios(db, lote)
+                insertados += ins
+                actualizados += upd
+                lote.clear()
+
+        ins, upd = _persistir_lote_precios(db, lote)
+        insertados += ins
+        actualizados += upd
         db.commit()
     except HTTPException:
         db.rollback()
@@ -1,10 +1,59 @@
+import functools
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import text
+from sqlalchemy import TextClause, event, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from ..utils.ttl_cache import TTLCache
+
 
 TIPO_VALUES = {"PT", "WIP", "MP", "EMB", "SERV", "HERR"}
+MYSQL_DUPLICATE_KEY = 1062
+
+# Resultados de listar_productos por combinación de filtros.
+_PRODUCTOS_CACHE = TTLCache(maxsize=256, ttl=30)
+# Marca en Session.info: la transacción escribió en producto.
+_CACHE_PENDIENTE = "producto_cache_pendiente"
+
+SQL_GET_PRODUCTO = text(
+    "SELECT id, codigo, nombre, tipo_producto, rubro, "
+    "unidad_medida_id, activo FROM producto WHERE id=:id"
+)
+SQL_EXISTS_UM = text("SELECT id FROM unidad_medida WHERE id=:id")
+SQL_CODIGO_DUPLICADO = text("SELECT id FROM producto WHERE codigo=:c AND id<>:id")
+SQL_INSERT_PRODUCTO = text(
+    "INSERT INTO producto (codigo, nombre, tipo_producto, rubro, "
+    "unidad_medida_id, activo) VALUES (:codigo, :nombre, :tipo, "
+    ":rubro, :um, :activo)"
+)
+SQL_UPDATE_PRODUCTO = text(
+    "UPDATE producto SET codigo=:codigo, nombre=:nombre, "
+    "tipo_producto=:tipo, rubro=:rubro, unidad_medida_id=:um, "
+    "activo=:activo WHERE id=:id"
+)
+SQL_DELETE_PRODUCTO = text("DELETE FROM producto WHERE id=:id")
+
+
+def invalidar_cache_productos() -> None:
+    _PRODUCTOS_CACHE.clear()
+
+
+def _invalidar_al_confirmar(db: Session) -> None:
+    # Limpiar antes del commit dejaría que un listado concurrente vuelva a
+    # cachear el catálogo previo; se limpia cuando la escritura es visible.
+    db.info[_CACHE_PENDIENTE] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _on_after_commit(session: Session) -> None:
+    if session.info.pop(_CACHE_PENDIENTE, False):
+        invalidar_cache_productos()
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_CACHE_PENDIENTE, None)
 
 
 def _row_to_producto(row: Any) -> Dict[str, Any]:
@@ -19,15 +68,64 @@ def _row_to_producto(row: Any) -> Dict[str, Any]:
     }
 
 
+def _producto_dict(
+    prod_id: int,
+    codigo: str,
+    nombre: str,
+    tipo_producto: str,
+    rubro: Optional[str],
+    unidad_medida_id: int,
+    activo: bool,
+) -> Dict[str, Any]:
+    # Respuesta de alta/edición armada con lo escrito, sin releer la fila.
+    return {
+        "id": prod_id,
+        "codigo": codigo,
+        "nombre": nombre,
+        "tipo_producto": tipo_producto,
+        "rubro": rubro,
+        "unidad_medida_id": unidad_medida_id,
+        "activo": bool(activo),
+    }
+
+
+def _ensure_codigo_libre(db: Session, codigo: str, prod_id: int = 0) -> None:
+    if db.execute(SQL_CODIGO_DUPLICADO, {"c": codigo, "id": prod_id}).first():
+        raise ValueError("El código de producto ya existe")
+
+
+def _is_duplicate_key(exc: IntegrityError) -> bool:
+    args: tuple = getattr(exc.orig, "args", ())
+    return bool(args) and args[0] == MYSQL_DUPLICATE_KEY
+
+
 def _ensure_um_exists(db: Session, um_id: int) -> None:
-    r = db.execute(
-        text("SELECT id FROM unidad_medida WHERE id=:id"),
-        {"id": um_id},
-    ).first()
+    r = db.execute(SQL_EXISTS_UM, {"id": um_id}).first()
     if not r:
         raise ValueError("La unidad de medida no existe")
 
 
+@functools.lru_cache(maxsize=32)
+def _sql_listar_productos(
+    has_q: bool, has_tipo: bool, has_rubro: bool, has_activo: bool
+) -> TextClause:
+    where = ["1=1"]
+    if has_q:
+        where.append("(codigo LIKE :q OR nombre LIKE :q)")
+    if has_tipo:
+        where.append("tipo_producto = :tipo")
+    if has_rubro:
+        where.append("rubro = :rubro")
+    if has_activo:
+        where.append("activo = :activo")
+    return text(
+        "SELECT id, codigo, nombre, tipo_producto, rubro, "
+        "unidad_medida_id, activo FROM producto WHERE "
+        + " AND ".join(where)
+        + " ORDER BY codigo LIMIT :limit OFFSET :offset"
+    )
+
+
 def listar_productos(
     db: Session,
     q: Optional[str] = None,
@@ -37,41 +135,34 @@ def listar_productos(
     limit: int = 50,
     offset: int = 0,
 ) -> List[Dict[str, Any]]:
-    where = ["1=1"]
     params: Dict[str, Any] = {"limit": limit, "offset": offset}
     if q:
-        where.append("(codigo LIKE :q OR nombre LIKE :q)")
         params["q"] = f"%{q}%"
     if tipo:
         if tipo not in TIPO_VALUES:
             raise ValueError("tipo_producto inválido")
-        where.append("tipo_producto = :tipo")
         params["tipo"] = tipo
     if rubro:
-        where.append("rubro = :rubro")
         params["rubro"] = rubro
     if activo is not None:
-        where.append("activo = :activo")
         params["activo"] = 1 if activo else 0
 
-    sql = text(
-        "SELECT id, codigo, nombre, tipo_producto, rubro, "
-        "unidad_medida_id, activo FROM producto WHERE "
-        + " AND ".join(where)
-        + " ORDER BY codigo LIMIT :limit OFFSET :offset"
+    cache_key = (q, tipo, rubro, activo, limit, offset)
+    cached = _PRODUCTOS_CACHE.get(cache_key)
+    if cached is not None:
+        return [dict(item) for item in cached]
+
+    sql = _sql_listar_productos(
+        bool(q), bool(tipo), bool(rubro), activo is not None
     )
     rows = db.execute(sql, params).fetchall()
-    return [_row_to_producto(r) for r in rows]
+    result = [_row_to_producto(r) for r in rows]
+    _PRODUCTOS_CACHE.set(cache_key, result)
+    return [dict(item) for item in result]
 
 
 def get_producto(db: Session, prod_id: int) -> Optional[Dict[str, Any]]:
-    row = db.execute(
-        text(
-            "SELECT id, codigo, nombre, tipo_producto, rubro, "
-            "unidad_medida_id, activo FROM producto WHERE id=:id"
-        ),
-        {"id": prod_id},
-    ).first()
+    row = db.execute(SQL_GET_PRODUCTO, {"id": prod_id}).first()
     return _row_to_producto(row) if row else None
 
 
@@ -88,36 +179,36 @@ def crear_producto(
         raise ValueError("tipo_producto inválido")
     _ensure_um_exists(db, unidad_medida_id)
 
-    # Verificar unicidad de codigo
-    dup = db.execute(
-        text("SELECT id FROM producto WHERE codigo=:c"),
-        {"c": codigo},
-    ).first()
-    if dup:
-        raise ValueError("El código de producto ya existe")
-
-    res = db.execute(
-        text(
-            "INSERT INTO producto (codigo, nombre, tipo_producto, rubro, "
-            "unidad_medida_id, activo) VALUES (:codigo, :nombre, :tipo, "
-            ":rubro, :um, :activo)"
-        ),
-        {
-            "codigo": codigo,
-            "nombre": nombre,
-            "tipo": tipo_producto,
-            "rubro": rubro,
-            "um": unidad_medida_id,
-            "activo": 1 if activo else 0,
-        },
-    )
+    # Ninguna migración garantiza un índice único en producto.codigo: se
+    # verifica antes; el 1062 cubre la carrera si el índice existe.
+    _ensure_codigo_libre(db, codigo)
+    try:
+        res = db.execute(
+            SQL_INSERT_PRODUCTO,
+            {
+                "codigo": codigo,
+                "nombre": nombre,
+                "tipo": tipo_producto,
+                "rubro": rubro,
+                "um": unidad_medida_id,
+                "activo": 1 if activo else 0,
+            },
+        )
+    except IntegrityError as exc:
+        if _is_duplicate_key(exc):
+            raise ValueError("El código de producto ya existe") from exc
+        raise
     new_id = getattr(res, "lastrowid", None)
     if not new_id:
         new_id = db.execute(text("SELECT LAST_INSERT_ID()"))
         new_id = new_id.scalar() if new_id else None
     if new_id is None:
         raise ValueError("No se pudo obtener el ID del nuevo producto")
-    return get_producto(db, int(new_id))  # type: ignore[return-value]
+    _invalidar_al_confirmar(db)
+    return _producto_dict(
+        int(new_id), codigo, nombre, tipo_producto, rubro,
+        unidad_medida_id, activo,
+    )
 
 
 def actualizar_producto(
@@ -139,31 +230,29 @@ def actualizar_producto(
     if not base:
         raise ValueError("Producto no encontrado")
 
-    # Verificar unicidad de codigo al actualizar
-    dup = db.execute(
-        text("SELECT id FROM producto WHERE codigo=:c AND id<>:id"),
-        {"c": codigo, "id": prod_id},
-    ).first()
-    if dup:
-        raise ValueError("El código de producto ya existe")
-
-    db.execute(
-        text(
-            "UPDATE producto SET codigo=:codigo, nombre=:nombre, "
-            "tipo_producto=:tipo, rubro=:rubro, unidad_medida_id=:um, "
-            "activo=:activo WHERE id=:id"
-        ),
-        {
-            "codigo": codigo,
-            "nombre": nombre,
-            "tipo": tipo_producto,
-            "rubro": rubro,
-            "um": unidad_medida_id,
-            "activo": 1 if activo else 0,
-            "id": prod_id,
-        },
+    _ensure_codigo_libre(db, codigo, prod_id)
+    try:
+        db.execute(
+            SQL_UPDATE_PRODUCTO,
+            {
+                "codigo": codigo,
+                "nombre": nombre,
+                "tipo": tipo_producto,
+                "rubro": rubro,
+                "um": unidad_medida_id,
+                "activo": 1 if activo else 0,
+                "id": prod_id,
+            },
+        )
+    except IntegrityError as exc:
+        if _is_duplicate_key(exc):
+            raise ValueError("El código de producto ya existe") from exc
+        raise
+    _invalidar_al_confirmar(db)
+    return _producto_dict(
+        prod_id, codigo, nombre, tipo_producto, rubro,
+        unidad_medida_id, activo,
     )
-    return get_producto(db, prod_id)  # type: ignore[return-value]
 
 
 def eliminar_producto(db: Session, prod_id: int) -> None:
@@ -172,7 +261,5 @@ def eliminar_producto(db: Session, prod_id: int) -> None:
     if not base:
         raise ValueError("Producto no encontrado")
 
-    db.execute(
-        text("DELETE FROM producto WHERE id=:id"),
-        {"id": prod_id},
-    )
+    db.execute(SQL_DELETE_PRODUCTO, {"id": prod_id})
+    _invalidar_al_confirmar(db)
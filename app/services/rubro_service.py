@@ -1,16 +1,31 @@
 from typing import List, Optional
 
+from sqlalchemy import Row, Select, exists, select
 from sqlalchemy.orm import Session
 
 from app.models.rubro import Rubro
+from app.services.producto_service import invalidar_cache_productos
+from app.utils.ttl_cache import TTLCache
+
+_RUBROS_CACHE = TTLCache(maxsize=4, ttl=30)
 
 
 def listar_rubros(db: Session, only_active: bool = False) -> List[dict]:
-    query = db.query(Rubro)
+    cached = _RUBROS_CACHE.get(only_active)
+    if cached is not None:
+        return [dict(item) for item in cached]
+    # Select de columnas: evita construir instancias ORM solo para serializar.
+    stmt: Select = select(
+        Rubro.id,
+        Rubro.nombre,
+        Rubro.activo,
+        Rubro.creado_en,
+        Rubro.actualizado_en,
+    )
     if only_active:
-        query = query.filter(Rubro.activo.is_(True))
-    rubros = query.order_by(Rubro.nombre).all()
-    return [
+        stmt = stmt.where(Rubro.activo.is_(True))
+    rows = db.execute(stmt.order_by(Rubro.nombre)).all()
+    result = [
         {
             "id": r.id,
             "nombre": r.nombre,
@@ -18,8 +33,10 @@ def listar_rubros(db: Session, only_active: bool = False) -> List[dict]:
             "creado_en": r.creado_en,
             "actualizado_en": r.actualizado_en,
         }
-        for r in rubros
+        for r in rows
     ]
+    _RUBROS_CACHE.set(only_active, result)
+    return [dict(item) for item in result]
 
 
 def _normalize_nombre(nombre: str) -> str:
@@ -31,14 +48,17 @@ def crear_rubro(db: Session, nombre: str) -> Rubro:
     rubro = Rubro(nombre=nombre)
     db.add(rubro)
     db.commit()
+    _RUBROS_CACHE.clear()
     db.refresh(rubro)
     return rubro
 
 
 def obtener_rubro_por_id(db: Session, rubro_id: int) -> Optional[dict]:
-    rubro = db.query(Rubro).filter(Rubro.id == rubro_id).first()
-    if rubro:
-        return {"id": rubro.id, "nombre": rubro.nombre}
+    row: Optional[Row] = db.execute(
+        select(Rubro.id, Rubro.nombre).where(Rubro.id == rubro_id)
+    ).first()
+    if row:
+        return {"id": row.id, "nombre": row.nombre}
     return None
 
 
@@ -60,6 +80,8 @@ def actualizar_rubro(db: Session, rubro_id: int, nombre: str) -> Optional[Rubro]
             {"nuevo": nombre, "anterior": nombre_anterior}
         )
         db.commit()
+        _RUBROS_CACHE.clear()
+        invalidar_cache_productos()
         db.refresh(rubro)
         return rubro
     except SQLAlchemyError:
@@ -74,12 +96,13 @@ def eliminar_rubro(db: Session, rubro_id: int) -> bool:
         return False
     db.delete(rubro)
     db.commit()
+    _RUBROS_CACHE.clear()
     return True
 
 
 def existe_rubro_unico(db: Session, nombre: str, exclude_id: Optional[int] = None) -> bool:
     nombre = _normalize_nombre(nombre)
-    query = db.query(Rubro).filter(Rubro.nombre == nombre)
+    cond = exists().where(Rubro.nombre == nombre)
     if exclude_id:
-        query = query.filter(Rubro.id != exclude_id)
-    return db.query(query.exists()).scalar()
+        cond = cond.where(Rubro.id != exclude_id)
+    return bool(db.scalar(select(cond)))
@@ -1,31 +1,59 @@
 """Servicios para plantillas de ruta de operaciones reutilizables."""
 from __future__ import annotations
 
+import functools
+from itertools import groupby
 from typing import Iterable, Optional
 
-from sqlalchemy import text
+from sqlalchemy import TextClause, text
 from sqlalchemy.orm import Session
 
 from . import mbom_operacion_service
 
 
-def listar_rutas_base(
-    db: Session,
-    q: Optional[str] = None,
-    solo_activas: Optional[bool] = None,
-    limit: int = 100,
-    offset: int = 0,
-) -> list[dict]:
-    where = ["1=1"]
+# Las fechas salen ya en ISO 8601 desde MySQL (mismo formato que
+# datetime.isoformat() sin microsegundos); NULL queda como None.
+_ISO_FMT = "'%Y-%m-%dT%H:%i:%s'"
+
+
+def _params_rutas(
+    q: Optional[str],
+    solo_activas: Optional[bool],
+    after: Optional[tuple[str, int]],
+    limit: int,
+    offset: int,
+) -> dict[str, object]:
     params: dict[str, object] = {"limit": limit, "offset": offset}
     if q:
-        where.append("(r.nombre LIKE :q OR r.descripcion LIKE :q)")
         params["q"] = f"%{q}%"
     if solo_activas is not None:
-        where.append("r.esta_activo = :activo")
         params["activo"] = 1 if solo_activas else 0
+    if after is not None:
+        params["after_nombre"], params["after_id"] = after
+        params["offset"] = 0
+    return params
+
+
+def _where_rutas(filtros: frozenset[str]) -> str:
+    """WHERE según los parámetros presentes (ver _params_rutas)."""
+    where = ["1=1"]
+    if "q" in filtros:
+        where.append("(r.nombre LIKE :q OR r.descripcion LIKE :q)")
+    if "activo" in filtros:
+        where.append("r.esta_activo = :activo")
+    if "after_nombre" in filtros:
+        # Keyset sobre (nombre, id): usa ix_rob_nombre_id en lugar de
+        # recorrer y descartar OFFSET filas.
+        where.append(
+            "(r.nombre > :after_nombre"
+            " OR (r.nombre = :after_nombre AND r.id > :after_id))"
+        )
+    return " AND ".join(where)
+
 
-    query = text(
+@functools.lru_cache(maxsize=16)
+def _sql_listar_rutas(filtros: frozenset[str]) -> TextClause:
+    return text(
         f"""
         SELECT
             r.id,
@@ -34,20 +62,40 @@ def listar_rutas_base(
             r.esta_activo,
             r.creado_por,
             r.actualizado_por,
-            r.fecha_creacion,
-            r.fecha_actualizacion,
-            (
-                SELECT COUNT(*)
-                FROM ruta_operacion_base_detalle d
-                WHERE d.ruta_id = r.id
-            ) AS total_operaciones
+            DATE_FORMAT(r.fecha_creacion, {_ISO_FMT}) AS fecha_creacion,
+            DATE_FORMAT(r.fecha_actualizacion, {_ISO_FMT})
+                AS fecha_actualizacion,
+            COALESCE(t.total, 0) AS total_operaciones
         FROM ruta_operacion_base r
-        WHERE {' AND '.join(where)}
-        ORDER BY r.nombre
+        LEFT JOIN (
+            SELECT ruta_id, COUNT(*) AS total
+            FROM ruta_operacion_base_detalle
+            GROUP BY ruta_id
+        ) t ON t.ruta_id = r.id
+        WHERE {_where_rutas(filtros)}
+        ORDER BY r.nombre, r.id
         LIMIT :limit OFFSET :offset
         """
     )
-    rows = db.execute(query, params).fetchall()
+
+
+def listar_rutas_base(
+    db: Session,
+    q: Optional[str] = None,
+    solo_activas: Optional[bool] = None,
+    limit: int = 100,
+    offset: int = 0,
+    after: Optional[tuple[str, int]] = None,
+) -> list[dict]:
+    """Lista plantillas ordenadas por nombre.
+
+    ``after`` es un cursor ``(nombre, id)`` tomado de la última fila de la
+    página anterior; cuando se informa, se ignora ``offset``.
+    """
+    params = _params_rutas(q, solo_activas, after, limit, offset)
+    rows = db.execute(
+        _sql_listar_rutas(frozenset(params)), params
+    ).fetchall()
     return [
         {
             "id": row.id,
@@ -56,78 +104,134 @@ def listar_rutas_base(
             "esta_activo": bool(row.esta_activo),
             "creado_por": row.creado_por,
             "actualizado_por": row.actualizado_por,
-            "fecha_creacion": row.fecha_creacion.isoformat()
-            if row.fecha_creacion
-            else None,
-            "fecha_actualizacion": row.fecha_actualizacion.isoformat()
-            if row.fecha_actualizacion
-            else None,
+            "fecha_creacion": row.fecha_creacion,
+            "fecha_actualizacion": row.fecha_actualizacion,
             "total_operaciones": row.total_operaciones,
         }
         for row in rows
     ]
 
 
-def obtener_ruta_base(db: Session, ruta_id: int) -> Optional[dict]:
-    ruta_query = text(
-        """
-        SELECT
+# Columnas de ruta + detalle + operación para armar la ruta con sus detalles
+# en una sola consulta (ver _agrupar_rutas).
+_COLUMNAS_RUTA_CON_DETALLES = f"""
             r.id,
             r.nombre,
             r.descripcion,
             r.esta_activo,
             r.creado_por,
             r.actualizado_por,
-            r.fecha_creacion,
-            r.fecha_actualizacion
-        FROM ruta_operacion_base r
-        WHERE r.id = :id
-        """
-    )
-    ruta_row = db.execute(ruta_query, {"id": ruta_id}).fetchone()
-    if not ruta_row:
-        return None
-
-    detalles = listar_detalles_ruta(db, ruta_id)
-    return {
-        "id": ruta_row.id,
-        "nombre": ruta_row.nombre,
-        "descripcion": ruta_row.descripcion,
-        "esta_activo": bool(ruta_row.esta_activo),
-        "creado_por": ruta_row.creado_por,
-        "actualizado_por": ruta_row.actualizado_por,
-        "fecha_creacion": ruta_row.fecha_creacion.isoformat()
-        if ruta_row.fecha_creacion
-        else None,
-        "fecha_actualizacion": ruta_row.fecha_actualizacion.isoformat()
-        if ruta_row.fecha_actualizacion
-        else None,
-        "detalles": detalles,
-    }
-
-
-def listar_detalles_ruta(db: Session, ruta_id: int) -> list[dict]:
-    detalle_query = text(
-        """
-        SELECT
-            d.id,
-            d.ruta_id,
+            DATE_FORMAT(r.fecha_creacion, {_ISO_FMT}) AS fecha_creacion,
+            DATE_FORMAT(r.fecha_actualizacion, {_ISO_FMT})
+                AS fecha_actualizacion,
+            d.id AS d_id,
             d.secuencia,
             d.operacion_id,
             d.notas,
             o.codigo AS operacion_codigo,
             o.nombre AS operacion_nombre,
             o.centro_trabajo,
-            o.tiempo_estandar_minutos,
-            o.costo_hora,
+            COALESCE(o.tiempo_estandar_minutos, 0) + 0E0
+                AS tiempo_estandar_minutos,
+            COALESCE(o.costo_hora, 0) + 0E0 AS costo_hora,
             o.moneda
-        FROM ruta_operacion_base_detalle d
+"""
+
+
+def _agrupar_rutas(rows) -> list[dict]:
+    """Agrupa filas ruta+detalle (ordenadas por ruta) en dicts de ruta."""
+    rutas: list[dict] = []
+    for _, grupo in groupby(rows, key=lambda row: row.id):
+        filas = list(grupo)
+        row = filas[0]
+        detalles = [
+            {
+                "id": det.d_id,
+                "ruta_id": det.id,
+                "secuencia": det.secuencia,
+                "operacion_id": det.operacion_id,
+                "operacion_codigo": det.operacion_codigo,
+                "operacion_nombre": det.operacion_nombre,
+                "centro_trabajo": det.centro_trabajo,
+                "tiempo_estandar_minutos": det.tiempo_estandar_minutos,
+                "costo_hora": det.costo_hora,
+                "moneda": det.moneda,
+                "notas": det.notas,
+            }
+            for det in filas
+            if det.d_id is not None
+        ]
+        rutas.append(
+            {
+                "id": row.id,
+                "nombre": row.nombre,
+                "descripcion": row.descripcion,
+                "esta_activo": bool(row.esta_activo),
+                "creado_por": row.creado_por,
+                "actualizado_por": row.actualizado_por,
+                "fecha_creacion": row.fecha_creacion,
+                "fecha_actualizacion": row.fecha_actualizacion,
+                "total_operaciones": len(detalles),
+                "detalles": detalles,
+            }
+        )
+    return rutas
+
+
+SQL_OBTENER_RUTA_BASE = text(
+    f"""
+    SELECT {_COLUMNAS_RUTA_CON_DETALLES}
+    FROM ruta_operacion_base r
+    -- Detalle y operación con INNER JOIN entre sí, como listar_detalles_ruta:
+    -- un detalle cuya operación no existe no se devuelve. El LEFT JOIN del
+    -- grupo conserva la ruta aunque no tenga detalles.
+    LEFT JOIN (
+        ruta_operacion_base_detalle d
         INNER JOIN operacion o ON o.id = d.operacion_id
-        WHERE d.ruta_id = :ruta_id
-        ORDER BY d.secuencia
-        """
+    ) ON d.ruta_id = r.id
+    WHERE r.id = :id
+    ORDER BY d.secuencia
+    """
+)
+
+
+def obtener_ruta_base(db: Session, ruta_id: int) -> Optional[dict]:
+    # Ruta y detalles en una sola ida a la base (antes eran dos consultas).
+    rutas = _agrupar_rutas(
+        db.execute(SQL_OBTENER_RUTA_BASE, {"id": ruta_id}).fetchall()
     )
-    rows = db.execute(detalle_query, {"ruta_id": ruta_id}).fetchall()
+    return rutas[0] if rutas else None
+
+
+# "+ 0E0" hace que MySQL devuelva DOUBLE: llega como float sin
+# convertir Decimal por fila en Python.
+SQL_LISTAR_DETALLES_RUTA = text(
+    """
+    SELECT
+        d.id,
+        d.ruta_id,
+        d.secuencia,
+        d.operacion_id,
+        d.notas,
+        o.codigo AS operacion_codigo,
+        o.nombre AS operacion_nombre,
+        o.centro_trabajo,
+        COALESCE(o.tiempo_estandar_minutos, 0) + 0E0
+            AS tiempo_estandar_minutos,
+        COALESCE(o.costo_hora, 0) + 0E0 AS costo_hora,
+        o.moneda
+    FROM ruta_operacion_base_detalle d
+    INNER JOIN operacion o ON o.id = d.operacion_id
+    WHERE d.ruta_id = :ruta_id
+    ORDER BY d.secuencia
+    """
+)
+
+
+def listar_detalles_ruta(db: Session, ruta_id: int) -> list[dict]:
+    rows = db.execute(
+        SQL_LISTAR_DETALLES_RUTA, {"ruta_id": ruta_id}
+    ).fetchall()
     return [
         {
             "id": row.id,
@@ -137,8 +241,8 @@ def listar_detalles_ruta(db: Session, ruta_id: int) -> list[dict]:
             "operacion_codigo": row.operacion_codigo,
             "operacion_nombre": row.operacion_nombre,
             "centro_trabajo": row.centro_trabajo,
-            "tiempo_estandar_minutos": float(row.tiempo_estandar_minutos or 0),
-            "costo_hora": float(row.costo_hora or 0),
+            "tiempo_estandar_minutos": row.tiempo_estandar_minutos,
+            "costo_hora": row.costo_hora,
             "moneda": row.moneda,
             "notas": row.notas,
         }
@@ -146,14 +250,28 @@ def listar_detalles_ruta(db: Session, ruta_id: int) -> list[dict]:
     ]
 
 
-def crear_ruta_base(
-    db: Session,
-    nombre: str,
-    descripcion: Optional[str],
-    detalles: Iterable[dict],
-    esta_activo: bool = True,
-    creado_por: Optional[str] = None,
-) -> dict:
+SQL_INSERT_RUTA = text(
+    """
+    INSERT INTO ruta_operacion_base
+        (nombre, descripcion, esta_activo, creado_por, actualizado_por)
+    VALUES
+        (:nombre, :descripcion, :activo, :creado_por, :actualizado_por)
+    """
+)
+SQL_INSERT_DETALLE = text(
+    """
+    INSERT INTO ruta_operacion_base_detalle
+        (ruta_id, secuencia, operacion_id, notas)
+    VALUES
+        (:ruta_id, :secuencia, :operacion_id, :notas)
+    """
+)
+SQL_DELETE_DETALLES = text(
+    "DELETE FROM ruta_operacion_base_detalle WHERE ruta_id = :ruta_id"
+)
+
+
+def _normalizar_detalles(detalles: Iterable[dict]) -> list[dict]:
     detalles_list = sorted(
         (
             {
@@ -165,23 +283,38 @@ def crear_ruta_base(
         ),
         key=lambda item: item["secuencia"],
     )
-    if not detalles_list:
-        raise ValueError("La ruta debe incluir al menos una operación")
-
     for det in detalles_list:
         if det["secuencia"] <= 0:
             raise ValueError("Las secuencias deben ser positivas")
+    return detalles_list
 
-    insert_ruta = text(
-        """
-        INSERT INTO ruta_operacion_base
-            (nombre, descripcion, esta_activo, creado_por, actualizado_por)
-        VALUES
-            (:nombre, :descripcion, :activo, :creado_por, :actualizado_por)
-        """
+
+def _insertar_detalles(
+    db: Session, ruta_id: int, detalles_list: list[dict]
+) -> None:
+    if not detalles_list:
+        return
+    # executemany: PyMySQL lo envía como un único INSERT multi-fila
+    db.execute(
+        SQL_INSERT_DETALLE,
+        [{"ruta_id": ruta_id, **det} for det in detalles_list],
     )
+
+
+def crear_ruta_base(
+    db: Session,
+    nombre: str,
+    descripcion: Optional[str],
+    detalles: Iterable[dict],
+    esta_activo: bool = True,
+    creado_por: Optional[str] = None,
+) -> dict:
+    detalles_list = _normalizar_detalles(detalles)
+    if not detalles_list:
+        raise ValueError("La ruta debe incluir al menos una operación")
+
     result = db.execute(
-        insert_ruta,
+        SQL_INSERT_RUTA,
         {
             "nombre": nombre,
             "descripcion": descripcion,
@@ -191,30 +324,23 @@ def crear_ruta_base(
         },
     )
     ruta_id = int(result.lastrowid)
-
-    insert_detalle = text(
-        """
-        INSERT INTO ruta_operacion_base_detalle
-            (ruta_id, secuencia, operacion_id, notas)
-        VALUES
-            (:ruta_id, :secuencia, :operacion_id, :notas)
-        """
-    )
-    for det in detalles_list:
-        db.execute(
-            insert_detalle,
-            {
-                "ruta_id": ruta_id,
-                "secuencia": det["secuencia"],
-                "operacion_id": det["operacion_id"],
-                "notas": det.get("notas"),
-            },
-        )
+    _insertar_detalles(db, ruta_id, detalles_list)
 
     db.commit()
     return obtener_ruta_base(db, ruta_id)  # type: ignore[return-value]
 
 
+@functools.lru_cache(maxsize=16)
+def _sql_update_ruta(updates: tuple[str, ...]) -> TextClause:
+    return text(
+        f"""
+        UPDATE ruta_operacion_base
+        SET {", ".join(updates)}, fecha_actualizacion = CURRENT_TIMESTAMP
+        WHERE id = :id
+        """
+    )
+
+
 def actualizar_ruta_base(
     db: Session,
     ruta_id: int,
@@ -224,6 +350,11 @@ def actualizar_ruta_base(
     actualizado_por: Optional[str] = None,
     detalles: Optional[Iterable[dict]] = None,
 ) -> dict:
+    # Validar antes de escribir: un error no deja un UPDATE pendiente.
+    detalles_list = (
+        _normalizar_detalles(detalles) if detalles is not None else None
+    )
+
     updates: list[str] = []
     params: dict[str, object] = {"id": ruta_id}
 
@@ -241,58 +372,11 @@ def actualizar_ruta_base(
         params["actualizado_por"] = actualizado_por
 
     if updates:
-        updates.append("fecha_actualizacion = CURRENT_TIMESTAMP")
-        update_sql = ", ".join(updates)
-        db.execute(
-            text(
-                f"""
-                UPDATE ruta_operacion_base
-                SET {update_sql}
-                WHERE id = :id
-                """
-            ),
-            params,
-        )
+        db.execute(_sql_update_ruta(tuple(updates)), params)
 
-    if detalles is not None:
-        detalles_list = sorted(
-            (
-                {
-                    "secuencia": int(det.get("secuencia", 0) or 0),
-                    "operacion_id": int(det["operacion_id"]),
-                    "notas": det.get("notas"),
-                }
-                for det in detalles
-            ),
-            key=lambda item: item["secuencia"],
-        )
-        for det in detalles_list:
-            if det["secuencia"] <= 0:
-                raise ValueError("Las secuencias deben ser positivas")
-        db.execute(
-            text(
-                "DELETE FROM ruta_operacion_base_detalle WHERE ruta_id = :ruta_id"
-            ),
-            {"ruta_id": ruta_id},
-        )
-        insert_detalle = text(
-            """
-            INSERT INTO ruta_operacion_base_detalle
-                (ruta_id, secuencia, operacion_id, notas)
-            VALUES
-                (:ruta_id, :secuencia, :operacion_id, :notas)
-            """
-        )
-        for det in detalles_list:
-            db.execute(
-                insert_detalle,
-                {
-                    "ruta_id": ruta_id,
-                    "secuencia": det["secuencia"],
-                    "operacion_id": det["operacion_id"],
-                    "notas": det.get("notas"),
-                },
-            )
+    if detalles_list is not None:
+        db.execute(SQL_DELETE_DETALLES, {"ruta_id": ruta_id})
+        _insertar_detalles(db, ruta_id, detalles_list)
 
     db.commit()
     ruta = obtener_ruta_base(db, ruta_id)
@@ -301,11 +385,11 @@ def actualizar_ruta_base(
     return ruta
 
 
+SQL_DELETE_RUTA = text("DELETE FROM ruta_operacion_base WHERE id = :id")
+
+
 def eliminar_ruta_base(db: Session, ruta_id: int) -> bool:
-    result = db.execute(
-        text("DELETE FROM ruta_operacion_base WHERE id = :id"),
-        {"id": ruta_id},
-    )
+    result = db.execute(SQL_DELETE_RUTA, {"id": ruta_id})
     db.commit()
     return bool(result.rowcount)  # type: ignore[attr-defined]
 
@@ -340,6 +424,25 @@ def crear_ruta_base_desde_mbom(
     )
 
 
+SQL_INSERT_MBOM_OPERACION = text(
+    """
+    INSERT INTO mbom_operacion (mbom_id, operacion_id, secuencia, notas)
+    VALUES (:mbom_id, :operacion_id, :secuencia, :notas)
+    """
+)
+
+SQL_DELETE_MBOM_OPERACIONES = text(
+    "DELETE FROM mbom_operacion WHERE mbom_id = :mbom_id"
+)
+SQL_SECUENCIAS_MBOM = text(
+    "SELECT secuencia FROM mbom_operacion WHERE mbom_id = :mbom_id"
+)
+SQL_MAX_SECUENCIA_MBOM = text(
+    "SELECT COALESCE(MAX(secuencia), 0) FROM mbom_operacion "
+    "WHERE mbom_id = :mbom_id"
+)
+
+
 def aplicar_ruta_base_a_mbom(
     db: Session,
     ruta_id: int,
@@ -356,31 +459,27 @@ def aplicar_ruta_base_a_mbom(
         raise ValueError("La ruta seleccionada no tiene operaciones asignadas")
 
     if reemplazar:
-        db.execute(
-            text("DELETE FROM mbom_operacion WHERE mbom_id = :mbom_id"),
-            {"mbom_id": mbom_id},
-        )
+        db.execute(SQL_DELETE_MBOM_OPERACIONES, {"mbom_id": mbom_id})
         secuencias_existentes: set[int] = set()
         siguiente_secuencia = 10
+    elif mantener_secuencia:
+        # Hace falta el conjunto completo para esquivar colisiones
+        secuencias_existentes = {
+            int(row.secuencia)
+            for row in db.execute(
+                SQL_SECUENCIAS_MBOM, {"mbom_id": mbom_id}
+            )
+        }
+        siguiente_secuencia = 10
     else:
-        existentes_rows = db.execute(
-            text(
-                "SELECT secuencia FROM mbom_operacion "
-                "WHERE mbom_id = :mbom_id ORDER BY secuencia"
-            ),
-            {"mbom_id": mbom_id},
-        ).fetchall()
-        secuencias_existentes = {row.secuencia for row in existentes_rows}
-        max_seq = max(secuencias_existentes) if secuencias_existentes else 0
+        # Solo se continúa desde el máximo: no traer todas las filas
+        max_seq = int(
+            db.scalar(SQL_MAX_SECUENCIA_MBOM, {"mbom_id": mbom_id}) or 0
+        )
+        secuencias_existentes = set()
         siguiente_secuencia = ((max_seq // 10) * 10) + 10 if max_seq else 10
 
-    insert_sql = text(
-        """
-        INSERT INTO mbom_operacion (mbom_id, operacion_id, secuencia, notas)
-        VALUES (:mbom_id, :operacion_id, :secuencia, :notas)
-        """
-    )
-
+    params_list: list[dict[str, object]] = []
     for det in detalles:
         if mantener_secuencia:
             secuencia = int(det["secuencia"])
@@ -390,15 +489,16 @@ def aplicar_ruta_base_a_mbom(
             secuencia = siguiente_secuencia
             siguiente_secuencia += 10
         secuencias_existentes.add(secuencia)
-        db.execute(
-            insert_sql,
+        params_list.append(
             {
                 "mbom_id": mbom_id,
                 "operacion_id": int(det["operacion_id"]),
                 "secuencia": secuencia,
                 "notas": det.get("notas"),
-            },
+            }
         )
+    # executemany: PyMySQL lo envía como un único INSERT multi-fila
+    db.execute(SQL_INSERT_MBOM_OPERACION, params_list)
 
     db.commit()
     return mbom_operacion_service.listar_operaciones_mbom(db, mbom_id)
@@ -1,20 +1,61 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
 import csv
+import functools
 import io
 import logging
+import math
 from datetime import datetime
 
 from fastapi import HTTPException, UploadFile
-from sqlalchemy import text
+from sqlalchemy import TextClause, bindparam, text
 from sqlalchemy.orm import Session
 
 from ..schemas.stock import StockItemOut, StockImportResult
+from ..utils.collation import clave_collation
 
 
-REQUIRED_STOCK_HEADERS = {"producto_codigo", "stock_disponible"}
+LOOKUP_CHUNK_SIZE = 1000
+MAX_ERRORES = 100
+
+SQL_PRODUCTO_IDS_ACTIVOS = text(
+    "SELECT id, codigo FROM producto WHERE activo = 1 AND codigo IN :codigos"
+).bindparams(bindparam("codigos", expanding=True))
+SQL_STOCK_EXISTENTE = text(
+    "SELECT producto_id FROM stock_disponible_mes WHERE anio=:a AND mes=:m"
+)
+SQL_UPDATE_STOCK = text(
+    """
+    UPDATE stock_disponible_mes
+    SET stock_disponible=:stk,
+        fecha_corte=:fc,
+        origen=:origen
+    WHERE anio=:a AND mes=:m AND producto_id=:pid
+    """
+)
+# VALUES solo con parámetros: un literal impide que PyMySQL pliegue el
+# executemany en un único INSERT multi-fila.
+SQL_INSERT_STOCK = text(
+    """
+    INSERT INTO stock_disponible_mes (
+        anio,
+        mes,
+        producto_id,
+        stock_disponible,
+        fecha_corte,
+        origen
+    )
+    VALUES (:a, :m, :pid, :stk, :fc, :origen)
+    """
+)
+SQL_RESUMEN_STOCK = text(
+    "SELECT COUNT(*) AS items, "
+    "COALESCE(SUM(stock_disponible),0) AS total "
+    "FROM stock_disponible_mes WHERE anio=:a AND mes=:m"
+)
 
 # Alias de columnas reconocidos en la hoja "Carga" (pegado libre desde ERP)
+# y, si falta la columna canónica, también en CSV y hojas comunes.
 _CARGA_CODE_ALIASES: frozenset[str] = frozenset({"codigo", "producto_codigo", "code", "cod", "c\u00f3digo"})
 _CARGA_STOCK_ALIASES: frozenset[str] = frozenset({"stock", "stock_disponible", "cantidad", "qty"})
 
@@ -24,10 +65,10 @@ def _parse_hoja_carga(ws) -> List[Dict[str, Any]]:
 
     Reconoce encabezados: codigo/producto_codigo/code  y  stock/stock_disponible/cantidad.
     """
-    header_row = next(ws.iter_rows(min_row=1, max_row=1), [])
+    header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
     headers = [
-        str(c.value).strip().lower() if c.value is not None else ""
-        for c in header_row
+        str(v).strip().lower() if v is not None else ""
+        for v in header_row
     ]
 
     code_col = next((i for i, h in enumerate(headers) if h in _CARGA_CODE_ALIASES), None)
@@ -40,62 +81,104 @@ def _parse_hoja_carga(ws) -> List[Dict[str, Any]]:
         )
 
     rows: List[Dict[str, Any]] = []
-    for r in ws.iter_rows(min_row=2):
-        codigo_val = r[code_col].value if code_col < len(r) else None
-        stock_val = r[stock_col].value if stock_col < len(r) else None
+    for r in ws.iter_rows(min_row=2, values_only=True):
+        codigo_val = r[code_col] if code_col < len(r) else None
+        stock_val = r[stock_col] if stock_col < len(r) else None
         if codigo_val is None:
             continue
         rows.append({
             "producto_codigo": str(codigo_val).strip(),
-            "stock_disponible": str(stock_val).strip() if stock_val is not None else "0",
+            "stock_disponible": stock_val if stock_val is not None else 0,
         })
     return rows
 
 
-def _get_producto_id(db: Session, codigo: str) -> Optional[int]:
-    q = text("SELECT id FROM producto WHERE codigo = :codigo AND activo = 1")
-    res = db.execute(q, {"codigo": codigo}).first()
-    return int(res[0]) if res else None
+def _resolver_columna(
+    headers: Iterable[str], preferida: str, alias: frozenset[str]
+) -> Optional[str]:
+    """Nombre de la columna a usar: la canónica o, si falta, un alias."""
+    headers = list(headers)
+    if preferida in headers:
+        return preferida
+    return next((h for h in headers if h in alias), None)
 
 
-def _parse_csv(content: bytes) -> List[Dict[str, Any]]:
-    if not content:
-        raise HTTPException(status_code=400, detail="Archivo CSV vacío")
+def _fetch_producto_ids(db: Session, codigos: List[str]) -> Dict[str, int]:
+    """Resuelve código -> id de productos activos en lotes de IN (...).
 
-    # Intentar UTF-8; si falla, usar latin-1 (Flexxus suele exportar en ANSI)
+    Las claves se normalizan con clave_collation: MySQL devuelve el código
+    guardado, que puede diferir del archivo en mayúsculas, acentos o
+    espacios finales.
+    """
+    id_map: Dict[str, int] = {}
+    for start in range(0, len(codigos), LOOKUP_CHUNK_SIZE):
+        chunk = codigos[start:start + LOOKUP_CHUNK_SIZE]
+        for r in db.execute(SQL_PRODUCTO_IDS_ACTIVOS, {"codigos": chunk}):
+            id_map[clave_collation(str(r.codigo))] = int(r.id)
+    return id_map
+
+
+def _parse_stock(raw: Any) -> Optional[float]:
+    """Convierte el stock a float; None si no es un número finito >= 0."""
+    if isinstance(raw, (int, float)) and not isinstance(raw, bool):
+        stock = float(raw)
+    elif isinstance(raw, str):
+        try:
+            stock = float(raw.replace(",", "."))
+        except ValueError:
+            return None
+    else:
+        return None
+    # float() acepta "nan"/"inf", que no son un stock válido
+    if not math.isfinite(stock) or stock < 0:
+        return None
+    return stock
+
+
+def _parse_csv(stream: BinaryIO) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Parsea el CSV leyendo del stream, sin cargar el archivo en memoria.
+
+    Intenta UTF-8; si falla, relee desde el inicio como latin-1 (Flexxus
+    suele exportar en ANSI). Devuelve (encabezados, filas).
+    """
     try:
-        decoded = content.decode("utf-8-sig")
+        return _parse_csv_text(stream, "utf-8-sig")
     except UnicodeDecodeError:
+        stream.seek(0)
+        return _parse_csv_text(stream, "latin-1")
+
+
+def _parse_csv_text(
+    stream: BinaryIO, encoding: str
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    text_stream = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    try:
+        sample = text_stream.read(2048)
+        if not sample:
+            raise HTTPException(status_code=400, detail="Archivo CSV vacío")
+        text_stream.seek(0)
         try:
-            decoded = content.decode("latin-1")
-        except UnicodeDecodeError as exc:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error as exc:
             raise HTTPException(
                 status_code=400,
-                detail=f"No se pudo decodificar el archivo CSV: {exc}",
+                detail=f"No se pudo detectar el formato del CSV: {exc}",
             )
 
-    text_stream = io.StringIO(decoded)
-    sample = text_stream.read(2048)
-    text_stream.seek(0)
-    try:
-        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
-    except csv.Error as exc:
-        raise HTTPException(
-            status_code=400,
-            detail=f"No se pudo detectar el formato del CSV: {exc}",
-        )
-
-    reader = csv.DictReader(text_stream, dialect=dialect)
-    rows = [
-        {
-            (k.strip() if isinstance(k, str) else k): (
-                v.strip() if isinstance(v, str) else v
-            )
-            for k, v in row.items()
-        }
-        for row in reader
-    ]
-    return rows
+        # csv.reader + zip en lugar de DictReader: el parseo queda en C y las
+        # claves se limpian una sola vez desde el encabezado.
+        reader = csv.reader(text_stream, dialect=dialect)
+        headers = [h.strip().lower() for h in next(reader, [])]
+        # Una fila corta no trae las claves finales: las columnas se resuelven
+        # desde headers, no desde las claves de una fila.
+        return headers, [
+            dict(zip(headers, map(str.strip, values)))
+            for values in reader
+            if values  # DictReader también omitía las líneas en blanco
+        ]
+    finally:
+        # detach: cerrar el wrapper no debe cerrar el archivo subido
+        text_stream.detach()
 
 
 def importar_stock_csv_o_excel(
@@ -110,12 +193,15 @@ def importar_stock_csv_o_excel(
         )
 
     filename = archivo.filename or ""
-    content = archivo.file.read()
+    # UploadFile.file ya es un SpooledTemporaryFile: se parsea desde ahí en
+    # lugar de copiar todo el contenido a memoria con read().
+    stream = archivo.file
 
     try:
+        headers: List[str]
         rows: List[Dict[str, Any]]
         if filename.lower().endswith(".csv") or filename == "":
-            rows = _parse_csv(content)
+            headers, rows = _parse_csv(stream)
         elif filename.lower().endswith(".xlsx"):
             try:
                 import openpyxl  # type: ignore
@@ -124,29 +210,34 @@ def importar_stock_csv_o_excel(
                     status_code=400,
                     detail="Soporte Excel no disponible; enviar CSV",
                 )
-            wb = openpyxl.load_workbook(io.BytesIO(content), read_only=True)
-
-            # Si el archivo contiene la hoja 'Carga' (plantilla con formato libre),
-            # se usa esa hoja con mapeo flexible de columnas.
-            if "Carga" in wb.sheetnames:
-                rows = _parse_hoja_carga(wb["Carga"])
-            else:
-                ws = wb.active
-                headers = [
-                    str(c.value).strip() if c.value is not None else ""
-                    for c in next(ws.iter_rows(min_row=1, max_row=1))
-                ]
-                rows = []
-                for r in ws.iter_rows(min_row=2):
-                    row = {}
-                    for idx, cell in enumerate(r):
-                        key = headers[idx] if idx < len(headers) else f"col_{idx}"
-                        row[key] = (
-                            str(cell.value).strip()
-                            if cell.value is not None
-                            else None
-                        )
-                    rows.append(row)
+            wb = openpyxl.load_workbook(stream, read_only=True)
+            try:
+                # Si el archivo contiene la hoja 'Carga' (plantilla con formato
+                # libre), se usa esa hoja con mapeo flexible de columnas.
+                if "Carga" in wb.sheetnames:
+                    rows = _parse_hoja_carga(wb["Carga"])
+                    headers = ["producto_codigo", "stock_disponible"]
+                else:
+                    ws = wb.active
+                    values_iter = ws.iter_rows(values_only=True)
+                    headers = [
+                        str(v).strip().lower() if v is not None else ""
+                        for v in next(values_iter, ())
+                    ]
+                    # values_only evita crear objetos Cell; los números quedan
+                    # nativos y solo se limpia el texto.
+                    rows = [
+                        {
+                            (
+                                headers[idx] if idx < len(headers)
+                                else f"col_{idx}"
+                            ): v.strip() if isinstance(v, str) else v
+                            for idx, v in enumerate(values)
+                        }
+                        for values in values_iter
+                    ]
+            finally:
+                wb.close()
         else:
             raise HTTPException(
                 status_code=400,
@@ -161,10 +252,15 @@ def importar_stock_csv_o_excel(
                 errores=["Archivo vacío"],
             )
 
-        headers_present = {k for k in rows[0].keys()}
-        if not REQUIRED_STOCK_HEADERS.issubset(
-            {h.lower() for h in headers_present}
-        ):
+        # Columnas resueltas una vez desde el encabezado (ya en minúscula);
+        # el loop hace un solo get por columna.
+        codigo_key = _resolver_columna(
+            headers, "producto_codigo", _CARGA_CODE_ALIASES
+        )
+        stock_key = _resolver_columna(
+            headers, "stock_disponible", _CARGA_STOCK_ALIASES
+        )
+        if codigo_key is None or stock_key is None:
             return StockImportResult(
                 insertados=0,
                 actualizados=0,
@@ -180,80 +276,72 @@ def importar_stock_csv_o_excel(
         rechazados = 0
         errores: List[str] = []
 
-        for idx, row in enumerate(rows, start=2):
-            codigo = (
-                row.get("producto_codigo") or row.get("PRODUCTO_CODIGO") or ""
-            ).strip()
-            stock_raw = (
-                row.get("stock_disponible") or row.get("STOCK_DISPONIBLE")
-            )
+        codigos = [
+            str(row.get(codigo_key) or "").strip()
+            for row in rows
+        ]
+        # Un solo lookup por código distinto, aunque se repita en el archivo
+        id_map = _fetch_producto_ids(
+            db, list(dict.fromkeys(c for c in codigos if c))
+        )
+        existentes = {
+            int(r[0])
+            for r in db.execute(SQL_STOCK_EXISTENTE, {"a": anio, "m": mes})
+        }
+        # producto_id -> parámetros; si un código se repite gana la última fila.
+        payload: Dict[int, Dict[str, Any]] = {}
+
+        for idx, (row, codigo) in enumerate(zip(rows, codigos), start=2):
+            stock_raw = row.get(stock_key)
+            # Solo se formatean los primeros MAX_ERRORES mensajes; el resto
+            # queda reflejado en rechazados.
             if not codigo:
                 rechazados += 1
-                errores.append(f"Fila {idx}: producto_codigo vacío")
+                if len(errores) < MAX_ERRORES:
+                    errores.append(f"Fila {idx}: producto_codigo vacío")
                 continue
-            try:
-                stock = float(str(stock_raw).replace(",", "."))
-                if stock < 0:
-                    raise ValueError()
-            except Exception:
+            stock = _parse_stock(stock_raw)
+            if stock is None:
                 rechazados += 1
-                errores.append(f"Fila {idx}: stock_disponible inválido")
+                if len(errores) < MAX_ERRORES:
+                    errores.append(f"Fila {idx}: stock_disponible inválido")
                 continue
 
-            prod_id = _get_producto_id(db, codigo)
+            prod_id = id_map.get(clave_collation(codigo))
             if not prod_id:
                 rechazados += 1
-                errores.append(
-                    f"Fila {idx}: producto no encontrado ({codigo})"
-                )
+                if len(errores) < MAX_ERRORES:
+                    errores.append(
+                        f"Fila {idx}: producto no encontrado ({codigo})"
+                    )
                 continue
 
-            upd = text(
-                """
-                UPDATE stock_disponible_mes
-                SET stock_disponible=:stk,
-                    fecha_corte=:fc,
-                    origen='ERP_FLEXXUS'
-                WHERE anio=:a AND mes=:m AND producto_id=:pid
-                """
-            )
-            r = db.execute(
-                upd,
-                {
-                    "stk": stock,
-                    "fc": fecha_corte,
-                    "a": anio,
-                    "m": mes,
-                    "pid": prod_id,
-                },
-            )
-            if r.rowcount and r.rowcount > 0:
+            if prod_id in existentes or prod_id in payload:
                 actualizados += 1
             else:
-                ins = text(
-                    """
-                    INSERT INTO stock_disponible_mes (
-                        anio,
-                        mes,
-                        producto_id,
-                        stock_disponible,
-                        fecha_corte,
-                        origen
-                    )
-                    VALUES (:a, :m, :pid, :stk, :fc, 'ERP_FLEXXUS')
-                    """
-                )
-                db.execute(
-                    ins,
-                    {
-                        "a": anio,
-                        "m": mes,
-                        "pid": prod_id,
-                        "stk": stock,
-                        "fc": fecha_corte,
-                    },
-                )
                 insertados += 1
+            payload[prod_id] = {
+                "a": anio,
+                "m": mes,
+                "pid": prod_id,
+                "stk": stock,
+                "fc": fecha_corte,
+                "origen": "ERP_FLEXXUS",
+            }
+
+        # UPDATE/INSERT separados según la precarga del período: no depende
+        # de un índice único (anio, mes, producto_id) en la tabla.
+        to_update = [p for pid, p in payload.items() if pid in existentes]
+        to_insert = [p for pid, p in payload.items() if pid not in existentes]
+        if to_update:
+            db.execute(SQL_UPDATE_STOCK, to_update)
+        if to_insert:
+            db.execute(SQL_INSERT_STOCK, to_insert)
+
+        if rechazados > len(errores):
+            errores.append(
+                f"... y {rechazados - len(errores)} filas rechazadas más"
+            )
 
         db.commit()
         return StockImportResult(
@@ -273,9 +361,10 @@ def importar_stock_csv_o_excel(
         )
 
 
-def listar_stock_periodo(
-    db: Session, anio: int, mes: int, q: Optional[str]
-) -> List[StockItemOut]:
+@functools.lru_cache(maxsize=8)
+def _sql_listar_stock_periodo(
+    has_q: bool, has_after: bool, has_limit: bool
+) -> TextClause:
     base_sql = (
         """
          SELECT s.id,
@@ -291,12 +380,43 @@ def listar_stock_periodo(
         WHERE s.anio = :a AND s.mes = :m
         """
     )
+    if has_q:
+        base_sql += " AND (p.codigo LIKE :q OR p.nombre LIKE :q)"
+    if has_after:
+        base_sql += (
+            " AND (p.codigo > :after_codigo"
+            " OR (p.codigo = :after_codigo AND s.id > :after_id))"
+        )
+    base_sql += " ORDER BY p.codigo, s.id"
+    if has_limit:
+        base_sql += " LIMIT :limit"
+    return text(base_sql)
+
+
+def listar_stock_periodo(
+    db: Session,
+    anio: int,
+    mes: int,
+    q: Optional[str],
+    limit: Optional[int] = None,
+    after: Optional[Tuple[str, int]] = None,
+) -> List[StockItemOut]:
+    """Lista el stock del período ordenado por código de producto.
+
+    Sin ``limit`` devuelve el período completo. ``after`` es un cursor
+    ``(producto_codigo, id)`` de la última fila de la página anterior.
+    """
     params: Dict[str, Any] = {"a": anio, "m": mes}
     if q:
-        base_sql += " AND (p.codigo LIKE :q OR p.nombre LIKE :q)"
         params["q"] = f"%{q}%"
-    base_sql += " ORDER BY p.codigo"
-    rows = db.execute(text(base_sql), params).mappings().all()
+    if after is not None:
+        params["after_codigo"], params["after_id"] = after
+    if limit is not None:
+        params["limit"] = limit
+    sql = _sql_listar_stock_periodo(
+        bool(q), after is not None, limit is not None
+    )
+    rows = db.execute(sql, params).mappings().all()
     return [
         StockItemOut(
             id=r["id"],
@@ -313,12 +433,7 @@ def listar_stock_periodo(
 
 
 def resumen_stock_periodo(db: Session, anio: int, mes: int) -> Dict[str, Any]:
-    q = text(
-        "SELECT COUNT(*) AS items, "
-        "COALESCE(SUM(stock_disponible),0) AS total "
-        "FROM stock_disponible_mes WHERE anio=:a AND mes=:m"
-    )
-    r = db.execute(q, {"a": anio, "m": mes}).first()
+    r = db.execute(SQL_RESUMEN_STOCK, {"a": anio, "m": mes}).first()
     return {
         "items": int(r[0]) if r else 0,
         "total_stock": float(r[1]) if r else 0.0,
@@ -3,6 +3,7 @@ from datetime import date
 from decimal import Decimal
 
 from openpyxl import load_workbook, Workbook
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models import StockDisponibleMes
@@ -63,10 +64,16 @@ def generar_template_xlsx(file_path: str):
 # Listar stock mensual
 
 
-def listar_stock_mensual(db: Session):
-    registros = db.query(StockDisponibleMes).all()
+def listar_stock_mensual(db: Session, limit: int = 1000, offset: int = 0):
+    stmt = (
+        select(StockDisponibleMes)
+        .order_by(StockDisponibleMes.id)
+        .limit(limit)
+        .offset(offset)
+        .execution_options(yield_per=500)
+    )
     resultado = []
-    for r in registros:
+    for r in db.execute(stmt).scalars():
         cantidad_val = (
             float(r.cantidad)
             if isinstance(r.cantidad, Decimal)
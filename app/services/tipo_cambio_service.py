@@ -1,9 +1,24 @@
 from datetime import date, datetime
-from typing import Any, List, Optional, Sequence, Tuple, Union
-from sqlalchemy import text
+import re
+from typing import (
+    Any,
+    Callable,
+    Generator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from sqlalchemy import bindparam, text
 from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
 
+try:
+    from python_calamine import CalamineWorkbook  # type: ignore
+except ImportError:  # pragma: no cover - dependencia opcional
+    CalamineWorkbook = None  # type: ignore
+
 from app.schemas.tipo_cambio import (
     TipoCambioCreate,
     TipoCambioUpdate,
@@ -13,11 +28,71 @@ from app.schemas.tipo_cambio import (
 
 SQLConn = Union[Connection, Session]
 
+IMPORT_CHUNK_SIZE = 1000
+
+# Upsert sobre uk_tc_moneda_fecha_tipo. Con executemany, PyMySQL envía cada
+# lote como un único INSERT multi-fila.
+SQL_UPSERT_TIPO_CAMBIO = text(
+    """
+    INSERT INTO tipo_cambio_hist (fecha, moneda, tipo, tasa, origen, notas)
+    VALUES (:fecha, :moneda, :tipo, :tasa, :origen, :notas)
+    ON DUPLICATE KEY UPDATE
+        tasa = VALUES(tasa),
+        origen = VALUES(origen),
+        notas = VALUES(notas)
+    """
+)
+# Línea "AAAA-MM-DD,tasa" ya normalizada a coma.
+_RE_FECHA_TASA = re.compile(
+    r"^\s*([0-9]{4})-([0-9]{2})-([0-9]{2})\s*,\s*([-+]?[0-9]+(?:\.[0-9]+)?)\s*$"
+)
+SQL_CLAVES_EXISTENTES = text(
+    """
+    SELECT moneda, fecha, tipo
+    FROM tipo_cambio_hist
+    WHERE moneda IN :monedas
+      AND tipo IN :tipos
+      AND fecha BETWEEN :desde AND :hasta
+    """
+).bindparams(
+    bindparam("monedas", expanding=True),
+    bindparam("tipos", expanding=True),
+)
+
+
+_COLUMNAS_TIPO_CAMBIO = (
+    "id, fecha, moneda, tipo, tasa, origen, notas, fecha_creacion"
+)
+SQL_OBTENER_POR_ID = text(
+    f"SELECT {_COLUMNAS_TIPO_CAMBIO} FROM tipo_cambio_hist WHERE id=:id"
+)
+
+
+def _serializar_fila(row: Sequence[Any]) -> dict:
+    """Fila en el orden de _COLUMNAS_TIPO_CAMBIO -> dict serializable a JSON."""
+    id_, fecha, moneda, tipo, tasa, origen, notas, fecha_creacion = row
+    return {
+        "id": id_,
+        "fecha": fecha.isoformat() if fecha is not None else None,
+        "moneda": moneda,
+        "tipo": tipo,
+        "tasa": float(tasa) if tasa is not None else None,
+        "origen": origen,
+        "notas": notas,
+        "fecha_creacion": (
+            fecha_creacion.isoformat() if fecha_creacion is not None else None
+        ),
+    }
+
 
 def listar_tipos_cambio(
     conn: SQLConn, filtro: TipoCambioFiltro
 ) -> List[dict]:
-    """Lista tipos de cambio con filtros opcionales."""
+    """Lista tipos de cambio con filtros opcionales.
+
+    Pagina por keyset sobre (fecha, id): la página siguiente se pide con
+    cursor_fecha/cursor_id de la última fila recibida.
+    """
     clauses = []
     params: dict[str, object] = {}
     if filtro.moneda:
@@ -32,27 +107,24 @@ def listar_tipos_cambio(
     if filtro.hasta:
         clauses.append("fecha <= :hasta")
         params["hasta"] = filtro.hasta
+    if filtro.cursor_fecha is not None and filtro.cursor_id is not None:
+        clauses.append(
+            "(fecha < :cursor_fecha"
+            " OR (fecha = :cursor_fecha AND id < :cursor_id))"
+        )
+        params["cursor_fecha"] = filtro.cursor_fecha
+        params["cursor_id"] = filtro.cursor_id
+    params["limit"] = filtro.limit
 
     where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
     sql = f"""
-    SELECT id, fecha, moneda, tipo, tasa, origen, notas, fecha_creacion
+    SELECT {_COLUMNAS_TIPO_CAMBIO}
     FROM tipo_cambio_hist
     {where_sql}
-    ORDER BY fecha DESC, moneda, tipo
+    ORDER BY fecha DESC, id DESC
+    LIMIT :limit
     """.strip()
-    result = conn.execute(text(sql), params).mappings()
-    rows = []
-    for r in result:
-        row_dict = dict(r)
-        # Convertir tipos no serializables a JSON
-        if row_dict.get("fecha"):
-            row_dict["fecha"] = row_dict["fecha"].isoformat()
-        if row_dict.get("fecha_creacion"):
-            row_dict["fecha_creacion"] = row_dict["fecha_creacion"].isoformat()
-        if row_dict.get("tasa"):
-            row_dict["tasa"] = float(row_dict["tasa"])
-        rows.append(row_dict)
-    return rows
+    return [_serializar_fila(r) for r in conn.execute(text(sql), params)]
 
 
 def obtener_resumen_ultimas_tasas(conn: SQLConn) -> List[dict]:
@@ -82,49 +154,37 @@ def obtener_resumen_ultimas_tasas(conn: SQLConn) -> List[dict]:
     return resumen
 
 
+# LAST_INSERT_ID(id) deja el id de la fila actualizada en lastrowid.
+SQL_UPDATE_TIPO_CAMBIO_POR_CLAVE = text(
+    """
+    UPDATE tipo_cambio_hist
+    SET id = LAST_INSERT_ID(id), tasa=:tasa, origen=:origen, notas=:notas
+    WHERE moneda=:moneda AND fecha=:fecha AND tipo=:tipo
+    """
+)
+SQL_INSERT_TIPO_CAMBIO = text(
+    """
+    INSERT INTO tipo_cambio_hist (fecha, moneda, tipo, tasa, origen, notas)
+    VALUES (:fecha, :moneda, :tipo, :tasa, :origen, :notas)
+    """
+)
+
+
 def upsert_tipo_cambio(
     conn: SQLConn, data: TipoCambioCreate
 ) -> Tuple[bool, int]:
     """Inserta o actualiza (si existe por PK única) un tipo de cambio.
     Devuelve (insertado, id).
+
+    Se intenta primero el UPDATE por clave: con CLIENT_FOUND_ROWS (default
+    del dialecto MySQL) el rowcount cuenta filas encontradas aunque la tasa
+    no cambie, así que una fila existente se resuelve en una sola ida.
     """
-    # Intentar obtener existente
-    sel = text("""
-        SELECT id FROM tipo_cambio_hist
-        WHERE moneda=:moneda AND fecha=:fecha AND tipo=:tipo
-    """)
-    existing = conn.execute(
-        sel,
-        {"moneda": data.moneda, "fecha": data.fecha, "tipo": data.tipo},
-    ).fetchone()
-    if existing:
-        upd = text("""
-            UPDATE tipo_cambio_hist
-            SET tasa=:tasa, origen=:origen, notas=:notas
-            WHERE id=:id
-        """)
-        conn.execute(
-            upd,
-            {
-                "tasa": data.tasa,
-                "origen": data.origen,
-                "notas": data.notas,
-                "id": existing.id,
-            },
-        )
-        return False, existing.id
-    ins = text("""
-        INSERT INTO tipo_cambio_hist (fecha, moneda, tipo, tasa, origen, notas)
-        VALUES (:fecha, :moneda, :tipo, :tasa, :origen, :notas)
-    """)
-    res = conn.execute(ins, {
-        "fecha": data.fecha,
-        "moneda": data.moneda,
-        "tipo": data.tipo,
-        "tasa": data.tasa,
-        "origen": data.origen,
-        "notas": data.notas,
-    })
+    params = data.model_dump()
+    res = conn.execute(SQL_UPDATE_TIPO_CAMBIO_POR_CLAVE, params)
+    if res.rowcount:  # type: ignore[attr-defined]
+        return False, res.lastrowid  # type: ignore[attr-defined]
+    res = conn.execute(SQL_INSERT_TIPO_CAMBIO, params)
     return True, res.lastrowid  # type: ignore[attr-defined]
 
 
@@ -153,22 +213,69 @@ def actualizar_tipo_cambio(
 
 
 def obtener_por_id(conn: SQLConn, id_: int) -> Optional[dict]:
-    sql = text("""
-        SELECT id, fecha, moneda, tipo, tasa, origen, notas, fecha_creacion
-        FROM tipo_cambio_hist WHERE id=:id
-    """)
-    row = conn.execute(sql, {"id": id_}).mappings().first()
-    if not row:
-        return None
-    row_dict = dict(row)
-    # Convertir tipos no serializables a JSON
-    if row_dict.get("fecha"):
-        row_dict["fecha"] = row_dict["fecha"].isoformat()
-    if row_dict.get("fecha_creacion"):
-        row_dict["fecha_creacion"] = row_dict["fecha_creacion"].isoformat()
-    if row_dict.get("tasa"):
-        row_dict["tasa"] = float(row_dict["tasa"])
-    return row_dict
+    row = conn.execute(SQL_OBTENER_POR_ID, {"id": id_}).first()
+    return _serializar_fila(row) if row is not None else None
+
+
+def upsert_tipos_cambio(
+    conn: SQLConn,
+    rows: List[dict],
+    chunk: int = IMPORT_CHUNK_SIZE,
+) -> Tuple[int, int]:
+    """Inserta/actualiza filas por lotes. Devuelve (insertados, actualizados).
+
+    El rowcount de ON DUPLICATE KEY no distingue un insert de un update sin
+    cambios (la conexión usa CLIENT_FOUND_ROWS), así que por lote se leen
+    antes las claves existentes: dos idas a la base cada ``chunk`` filas.
+    """
+    insertados = 0
+    actualizados = 0
+    for start in range(0, len(rows), chunk):
+        lote = rows[start:start + chunk]
+        fechas = [r["fecha"] for r in lote]
+        existentes = {
+            (r.moneda, r.fecha, r.tipo)
+            for r in conn.execute(
+                SQL_CLAVES_EXISTENTES,
+                {
+                    "monedas": sorted({r["moneda"] for r in lote}),
+                    "tipos": sorted({r["tipo"] for r in lote}),
+                    "desde": min(fechas),
+                    "hasta": max(fechas),
+                },
+            )
+        }
+        for r in lote:
+            key = (r["moneda"], r["fecha"], r["tipo"])
+            if key in existentes:
+                actualizados += 1
+            else:
+                insertados += 1
+                existentes.add(key)
+        conn.execute(SQL_UPSERT_TIPO_CAMBIO, lote)
+    return insertados, actualizados
+
+
+def _constructor_filas(
+    moneda: str, tipo: str, origen: str
+) -> Callable[[date, float], dict]:
+    """Arma filas para upsert_tipos_cambio sin un modelo pydantic por fila.
+
+    moneda/tipo/origen son fijos en toda la importación; por fila solo
+    varían fecha y tasa, y de TipoCambioCreate solo aplica la regla tasa > 0.
+    """
+    def fila(fecha: date, tasa: float) -> dict:
+        if not tasa > 0:
+            raise ValueError(f"La tasa debe ser mayor a 0 ({tasa})")
+        return {
+            "fecha": fecha,
+            "moneda": moneda,
+            "tipo": tipo,
+            "tasa": tasa,
+            "origen": origen,
+            "notas": None,
+        }
+    return fila
 
 
 def bulk_import_csv(
@@ -187,29 +294,60 @@ def bulk_import_csv(
     import csv
     from io import StringIO
 
-    insertados = 0
-    actualizados = 0
     errores: List[str] = []
+    # Se valida todo primero y se escribe por lotes al final.
+    pendientes: List[dict] = []
+    _fila = _constructor_filas(moneda, tipo, origen)
 
     # Normalizar separadores ; a ,
     normalized = contenido_csv.replace(";", ",")
-    f = StringIO(normalized)
-    reader = csv.reader(f)
-
-    # Detectar encabezado
-    try:
-        first_row_peek = next(reader)
-    except StopIteration:
+    if not normalized:
         return 0, 0, ["Archivo vacío"]
 
+    # Detectar encabezado mirando solo la primera línea
+    first_line = normalized.split("\n", 1)[0]
+    first_row_peek = next(csv.reader([first_line]), [])
     has_header = bool(
         first_row_peek and any(h.lower() in ("fecha", "tasa") for h in first_row_peek)
     )
 
-    if has_header:
-        # Re-crear reader para después del encabezado
-        f.seek(0)
-        dict_reader = csv.DictReader(f)
+    encabezado = [h.strip().lower() for h in first_row_peek]
+    if not has_header or encabezado[:2] == ["fecha", "tasa"]:
+        # Orden fecha,tasa: camino rápido por regex línea a línea; csv.reader
+        # solo para las líneas que no encajan (comillas, formatos raros).
+        lineas = normalized.splitlines()
+        inicio = 1
+        if has_header:
+            lineas = lineas[1:]
+            inicio = 2
+        for idx, linea in enumerate(lineas, start=inicio):
+            m = _RE_FECHA_TASA.match(linea)
+            try:
+                if m:
+                    anio, mes, dia, tasa_str = m.groups()
+                    fecha_dt = date(int(anio), int(mes), int(dia))
+                    pendientes.append(_fila(fecha_dt, float(tasa_str)))
+                    continue
+                # Lo que no encaja va al camino lento, que reporta el error
+                # como antes (p. ej. un campo vacío en un archivo sin
+                # encabezado falla en fromisoformat/float).
+                cols = next(csv.reader([linea]), [])
+                if has_header:
+                    if not cols:  # DictReader omitía las líneas vacías
+                        continue
+                    if len(cols) < 2 or not cols[0] or not cols[1]:
+                        errores.append(f"Línea {idx}: faltan campos")
+                        continue
+                elif len(cols) < 2:
+                    continue
+                fecha_dt = date.fromisoformat(cols[0].strip())
+                tasa_val = float(cols[1].strip())
+                pendientes.append(_fila(fecha_dt, tasa_val))
+            except Exception as e:  # noqa: BLE001
+                errores.append(f"Línea {idx}: {e}")
+    else:
+        # Encabezado con otro orden de columnas: se resuelve por nombre
+        dict_reader = csv.DictReader(StringIO(normalized))
         for idx, row in enumerate(dict_reader, start=2):
             try:
                 fecha_str = row.get("fecha") or row.get("Fecha")
@@ -219,53 +357,59 @@ def bulk_import_csv(
                     continue
                 fecha_dt = date.fromisoformat(fecha_str.strip())
                 tasa_val = float(tasa_str.strip())
-                creado, _ = upsert_tipo_cambio(
-                    conn,
-                    TipoCambioCreate(
-                        fecha=fecha_dt,
-                        moneda=moneda,
-                        tipo=tipo,
-                        tasa=tasa_val,
-                        origen=origen,
-                        notas=None,
-                    ),
-                )
-                if creado:
-                    insertados += 1
-                else:
-                    actualizados += 1
-            except Exception as e:  # noqa: BLE001
-                errores.append(f"Línea {idx}: {e}")
-    else:
-        # Sin encabezado: columnas esperadas fecha,tasa
-        f.seek(0)
-        for idx, cols in enumerate(csv.reader(f), start=1):
-            if not cols or len(cols) < 2:
-                continue
-            try:
-                fecha_dt = date.fromisoformat(cols[0].strip())
-                tasa_val = float(cols[1].strip())
-                creado, _ = upsert_tipo_cambio(
-                    conn,
-                    TipoCambioCreate(
-                        fecha=fecha_dt,
-                        moneda=moneda,
-                        tipo=tipo,
-                        tasa=tasa_val,
-                        origen=origen,
-                        notas=None,
-                    ),
-                )
-                if creado:
-                    insertados += 1
-                else:
-                    actualizados += 1
+                pendientes.append(_fila(fecha_dt, tasa_val))
             except Exception as e:  # noqa: BLE001
                 errores.append(f"Línea {idx}: {e}")
 
+    insertados, actualizados = upsert_tipos_cambio(conn, pendientes)
     return insertados, actualizados, errores
 
 
+def _filas_xlsx(
+    file_bytes: bytes, sheet_name: str | None
+) -> Generator[Sequence[Any], None, None]:
+    """Valores de cada fila de la hoja (sheet_name o la primera/activa).
+
+    Usa python-calamine si está instalado; si no, o si no puede leer el
+    archivo, openpyxl en modo read_only.
+    """
+    from io import BytesIO
+
+    if CalamineWorkbook is not None:
+        try:
+            cwb = CalamineWorkbook.from_filelike(BytesIO(file_bytes))
+            cws = (
+                cwb.get_sheet_by_name(sheet_name)
+                if sheet_name and sheet_name in cwb.sheet_names
+                else cwb.get_sheet_by_index(0)
+            )
+            # skip_empty_area=False conserva la numeración de filas
+            valores = cws.to_python(skip_empty_area=False)
+        except Exception:  # noqa: BLE001
+            valores = None
+        if valores is not None:
+            yield from valores
+            return
+
+    from openpyxl import load_workbook  # type: ignore[import-not-found]
+
+    # read_only + values_only: sin DOM completo ni objetos Cell
+    wb = load_workbook(
+        filename=BytesIO(file_bytes), read_only=True, data_only=True
+    )
+    try:
+        ws = (
+            wb[sheet_name]
+            if sheet_name and sheet_name in wb.sheetnames
+            else wb.active
+        )
+        if ws is None:
+            raise ValueError("No se encontró una hoja activa en el archivo")
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
 def bulk_import_xlsx(
     conn: SQLConn,
     file_bytes: bytes,
@@ -278,88 +422,63 @@ def bulk_import_xlsx(
     Se espera columnas con encabezados 'fecha' y 'tasa' (case-insensitive).
     Si no se encuentra sheet_name se usa la primera hoja.
     """
-    from openpyxl import load_workbook  # type: ignore[import-not-found]
-
-    insertados = 0
-    actualizados = 0
     errores: List[str] = []
+    pendientes: List[dict] = []
+    _fila = _constructor_filas(moneda, tipo, origen)
 
-    from io import BytesIO
-    try:
-        wb = load_workbook(filename=BytesIO(file_bytes))
-    except Exception as e:  # noqa: BLE001
-        return 0, 0, [f"Error leyendo XLSX: {e}"]
-
-    ws = (
-        wb[sheet_name]
-        if sheet_name and sheet_name in wb.sheetnames
-        else wb.active
-    )
-    if ws is None:
-        return 0, 0, ["No se encontró una hoja activa en el archivo XLSX"]
-
-    # Detectar encabezados
-    header_row = None
-    for row in ws.iter_rows(min_row=1, max_row=5):  # primeras filas
-        values = [
-            str(c.value).strip().lower() if c.value is not None else ""
-            for c in row
-        ]
-        if "fecha" in values and "tasa" in values:
-            header_row = row[0].row
-            break
-    if header_row is None:
-        return 0, 0, [
-            "No se encontró encabezado con columnas 'fecha' y 'tasa'"
-        ]
-
-    # Mapear índices
-    headers = [
-        str(c.value).strip().lower() if c.value is not None else ""
-        for c in ws[header_row]
-    ]
+    hoja = _filas_xlsx(file_bytes, sheet_name)
     try:
-        idx_fecha = headers.index("fecha")
-        idx_tasa = headers.index("tasa")
-    except ValueError:
-        return 0, 0, ["Encabezados inválidos"]
-
-    for row in ws.iter_rows(min_row=header_row + 1):
-        fecha_cell = row[idx_fecha].value
-        tasa_cell = row[idx_tasa].value
-        if fecha_cell in (None, "") or tasa_cell in (None, ""):
-            continue
+        # Una sola pasada: se busca el encabezado en las primeras filas y
+        # el mismo iterador sigue con los datos.
+        filas = enumerate(hoja, start=1)
+        idx_fecha = idx_tasa = -1
         try:
-            # Convertir fecha si es datetime/date
-            if isinstance(fecha_cell, datetime):
-                fecha_dt_obj = fecha_cell.date()
-            elif isinstance(fecha_cell, date):
-                fecha_dt_obj = fecha_cell
-            else:
-                fecha_dt_obj = date.fromisoformat(str(fecha_cell).strip())
-
-            if not isinstance(fecha_dt_obj, date):
-                raise ValueError("Fecha inválida")
-
-            tasa_val = float(str(tasa_cell).strip())
-            creado, _ = upsert_tipo_cambio(
-                conn,
-                TipoCambioCreate(
-                    fecha=fecha_dt_obj,
-                    moneda=moneda,
-                    tipo=tipo,
-                    tasa=tasa_val,
-                    origen=origen,
-                    notas=None,
-                ),
-            )
-            if creado:
-                insertados += 1
-            else:
-                actualizados += 1
+            for nro, values in filas:
+                headers = [
+                    str(v).strip().lower() if v is not None else ""
+                    for v in values
+                ]
+                if "fecha" in headers and "tasa" in headers:
+                    idx_fecha = headers.index("fecha")
+                    idx_tasa = headers.index("tasa")
+                    break
+                if nro >= 5:  # primeras filas
+                    break
         except Exception as e:  # noqa: BLE001
-            errores.append(f"Fila {row[0].row}: {e}")
+            return 0, 0, [f"Error leyendo XLSX: {e}"]
+        if idx_fecha < 0:
+            return 0, 0, [
+                "No se encontró encabezado con columnas 'fecha' y 'tasa'"
+            ]
+
+        ancho = max(idx_fecha, idx_tasa) + 1
+        for nro, values in filas:
+            if len(values) < ancho:
+                continue
+            fecha_cell = values[idx_fecha]
+            tasa_cell = values[idx_tasa]
+            if fecha_cell in (None, "") or tasa_cell in (None, ""):
+                continue
+            try:
+                # Convertir fecha si es datetime/date
+                if isinstance(fecha_cell, datetime):
+                    fecha_dt_obj = fecha_cell.date()
+                elif isinstance(fecha_cell, date):
+                    fecha_dt_obj = fecha_cell
+                else:
+                    fecha_dt_obj = date.fromisoformat(str(fecha_cell).strip())
+
+                if not isinstance(fecha_dt_obj, date):
+                    raise ValueError("Fecha inválida")
+
+                tasa_val = float(str(tasa_cell).strip())
+                pendientes.append(_fila(fecha_dt_obj, tasa_val))
+            except Exception as e:  # noqa: BLE001
+                errores.append(f"Fila {nro}: {e}")
+    finally:
+        hoja.close()
 
+    insertados, actualizados = upsert_tipos_cambio(conn, pendientes)
     return insertados, actualizados, errores
 
 
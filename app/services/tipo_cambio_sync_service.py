@@ -8,7 +8,7 @@ from typing import Optional
 from app.core.config import get_settings
 from app.schemas.tipo_cambio import TipoCambioCreate
 from app.services.fx_provider import BcraFxProvider, FxProviderError, FxRate
-from app.services.tipo_cambio_service import SQLConn, upsert_tipo_cambio
+from app.services.tipo_cambio_service import SQLConn, upsert_tipos_cambio
 
 _SETTINGS = get_settings()
 
@@ -80,14 +80,10 @@ def sync_bcra_tipos_cambio(
         if created_provider and provider:
             provider.close()
 
-    insertados = 0
-    actualizados = 0
-    for tasa in tasas:
-        insertado = _persistir_tasa(db, tasa)
-        if insertado:
-            insertados += 1
-        else:
-            actualizados += 1
+    # Un solo upsert por lote en lugar de SELECT + INSERT/UPDATE por tasa
+    insertados, actualizados = upsert_tipos_cambio(
+        db, [_payload_tasa(tasa) for tasa in tasas]
+    )
     return SyncResumen(
         insertados=insertados,
         actualizados=actualizados,
@@ -97,14 +93,12 @@ def sync_bcra_tipos_cambio(
     )
 
 
-def _persistir_tasa(db: SQLConn, tasa: FxRate) -> bool:
-    payload = TipoCambioCreate(
+def _payload_tasa(tasa: FxRate) -> dict:
+    return TipoCambioCreate(
         fecha=tasa.fecha,
         moneda=tasa.moneda,
         tipo=tasa.tipo,
         tasa=tasa.tasa,
         origen="OTRO",
         notas=tasa.notas,
-    )
-    creado, _ = upsert_tipo_cambio(db, payload)  # type: ignore[arg-type]
-    return creado
+    ).model_dump()
@@ -0,0 +1,16 @@
+"""Claves de comparación equivalentes a la collation de MySQL."""
+import functools
+import unicodedata
+
+
+@functools.lru_cache(maxsize=4096)
+def clave_collation(valor: str) -> str:
+    """Aproxima la igualdad de utf8mb4_unicode_ci: sin distinguir mayúsculas
+    ni acentos y sin espacios finales (PAD SPACE)."""
+    if valor.isascii():
+        return valor.rstrip(" ").casefold()
+    sin_acentos = "".join(
+        ch for ch in unicodedata.normalize("NFD", valor)
+        if not unicodedata.combining(ch)
+    )
+    return sin_acentos.rstrip(" ").casefold()
@@ -3,13 +3,14 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
+SQL_DB_STATUS = text("SELECT 1 AS ok, DATABASE() AS db")
+
 
 def db_status(db: Session) -> Dict[str, str]:
     try:
-        r = db.execute(text("SELECT 1")).first()
-        dbname = db.execute(text("SELECT DATABASE()"))
-        dbname_val = dbname.scalar() if dbname else None
-        ok = bool(r and r[0] == 1)
+        r = db.execute(SQL_DB_STATUS).first()
+        ok = bool(r and r.ok == 1)
+        dbname_val = r.db if r else None
         return {
             "ok": "true" if ok else "false",
             "database": dbname_val or "(desconocida)",
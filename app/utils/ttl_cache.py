@@ -0,0 +1,48 @@
+"""Caché en memoria de proceso con expiración por TTL.
+
+Pensada para lecturas de catálogos que cambian poco (productos, rubros):
+cada worker mantiene su copia y la invalida al escribir; el TTL acota la
+desactualización frente a escrituras hechas por otros workers.
+"""
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                expired = [k for k, (exp, _) in self._data.items() if exp < now]
+                for k in expired:
+                    del self._data[k]
+                if len(self._data) >= self.maxsize:
+                    # dict conserva orden de inserción: se descarta la más vieja
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (now + self.ttl, value)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,6 @@
+-- Migration: índice para paginación keyset del historial de precios
+-- listar_precios_compra ordena por (fecha_precio DESC, id DESC) y pagina con
+-- cursor (fecha_precio, id).
+
+ALTER TABLE precio_compra_hist
+  ADD INDEX ix_pch_fecha_id (fecha_precio, id);
@@ -0,0 +1,5 @@
+-- Migration: índice para paginación keyset de plantillas de ruta
+-- listar_rutas_base ordena por (nombre, id) y pagina con cursor (nombre, id).
+
+ALTER TABLE ruta_operacion_base
+  ADD INDEX ix_rob_nombre_id (nombre, id);
@@ -0,0 +1,6 @@
+-- Migration: índice para los detalles de plantillas de ruta
+-- ruta_operacion_base_detalle: detalles ordenados por secuencia y
+-- MAX(secuencia) por ruta sin ordenar en memoria.
+
+ALTER TABLE ruta_operacion_base_detalle
+  ADD INDEX idx_rob_detalle_ruta_secuencia (ruta_id, secuencia);
@@ -0,0 +1,13 @@
+-- Migration: índice para el listado paginado de tipo_cambio_hist
+-- listar_tipos_cambio ordena por (fecha DESC, id DESC) con cursor keyset.
+-- InnoDB agrega la PK (id) a cada índice secundario, así que (fecha) ya
+-- sirve ese orden recorriéndolo hacia atrás, sin filesort ni DESC explícito
+-- (MariaDB < 10.8 ignora DESC en índices). Con filtro por moneda se usa el
+-- existente ix_tc_moneda_fecha (moneda, fecha[, id]).
+--
+-- Verificar con:
+--   EXPLAIN SELECT id FROM tipo_cambio_hist
+--   ORDER BY fecha DESC, id DESC LIMIT 500;
+
+ALTER TABLE tipo_cambio_hist
+  ADD INDEX ix_tc_fecha (fecha);
@@ -0,0 +1,6 @@
+-- Migration: índice para paginación keyset del historial por producto
+-- listar_precios_compra filtrado por producto_id, con el mismo orden y
+-- cursor (fecha_precio, id) que la migración 014.
+
+ALTER TABLE precio_compra_hist
+  ADD INDEX ix_pch_producto_fecha (producto_id, fecha_precio, id);
@@ -0,0 +1,6 @@
+-- Migration: índice para las operaciones de MBOM
+-- mbom_operacion: operaciones ordenadas por secuencia y MAX(secuencia) por
+-- MBOM al aplicar una plantilla de ruta.
+
+ALTER TABLE mbom_operacion
+  ADD INDEX idx_mbom_operacion_secuencia (mbom_id, secuencia);
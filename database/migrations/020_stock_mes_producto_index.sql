@@ -0,0 +1,7 @@
+-- Migration: índice para lookups de stock por período
+-- stock_disponible_mes: la precarga del import (anio, mes) y el UPDATE por
+-- producto. No es UNIQUE: una tabla con períodos duplicados no debe frenar
+-- la migración, y el import no depende de la unicidad.
+
+ALTER TABLE stock_disponible_mes
+  ADD INDEX idx_stock_mes_producto (anio, mes, producto_id);
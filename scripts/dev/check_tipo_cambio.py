@@ -1,4 +1,5 @@
 """Script para verificar las tasas de cambio disponibles."""
+import argparse
 import sys
 from pathlib import Path
 from sqlalchemy import text
@@ -8,27 +9,64 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from app.db import SessionLocal  # noqa: E402
 
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Resumen de tasas por moneda; detalle con --moneda"
+    )
+    parser.add_argument("--moneda", help="Listar las tasas de esta moneda")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=50,
+        help="Máximo de tasas a listar con --moneda (default 50, 0 = todas)",
+    )
+    return parser.parse_args()
+
+
 def main():
+    args = _parse_args()
     db = SessionLocal()
     try:
         print("\n=== Tasas de cambio disponibles ===\n")
-        result = db.execute(
+        resumen = db.execute(
             text("""
-                SELECT fecha, moneda, tipo, tasa, origen
+                SELECT moneda, COUNT(*) AS cantidad,
+                       MIN(fecha) AS desde, MAX(fecha) AS hasta
                 FROM tipo_cambio_hist
-                ORDER BY moneda, fecha DESC
+                GROUP BY moneda
+                ORDER BY moneda
             """)
-        )
+        ).mappings()
+        for row in resumen:
+            print(
+                f"{row['moneda']:8s} | {row['cantidad']:6d} tasas | "
+                f"{row['desde']} -> {row['hasta']}"
+            )
 
-        current_moneda = None
-        for row in result:
-            if current_moneda != row.moneda:
-                if current_moneda is not None:
-                    print()
-                current_moneda = row.moneda
-                print(f"--- {row.moneda} ---")
-
-            print(f"{row.fecha} | {row.tipo:8s} | {row.tasa:12.6f} | {row.origen}")
+        if args.moneda:
+            sql = """
+                SELECT fecha, tipo, tasa, origen
+                FROM tipo_cambio_hist
+                WHERE moneda = :moneda
+                ORDER BY fecha DESC
+            """
+            params: dict = {"moneda": args.moneda}
+            if args.limit > 0:
+                print(f"\n--- {args.moneda} (últimas {args.limit}) ---")
+                sql += " LIMIT :limit"
+                params["limit"] = args.limit
+            else:
+                print(f"\n--- {args.moneda} ---")
+            # Cursor del lado del servidor (SSCursor en PyMySQL): con --limit 0
+            # la memoria no crece con el tamaño del historial.
+            detalle = db.execute(
+                text(sql).execution_options(yield_per=1000), params
+            ).mappings()
+            for row in detalle:
+                print(
+                    f"{row['fecha']} | {row['tipo']:8s} | "
+                    f"{row['tasa']:12.6f} | {row['origen']}"
+                )
 
         print("\n=== Productos con precio en USD_MAY ===\n")
         result2 = db.execute(
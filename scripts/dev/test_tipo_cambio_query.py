@@ -11,7 +11,7 @@ with _engine.connect() as conn:
     result = conn.execute(text("SELECT * FROM tipo_cambio_hist LIMIT 3")).mappings()
     print("Estructura de datos retornados:")
     for r in result:
-        data = dict(r)
-        print(f"\nRegistro: {data}")
-        for k, v in data.items():
+        # RowMapping ya expone items(): no hace falta copiarlo a un dict
+        print(f"\nRegistro: {r}")
+        for k, v in r.items():
             print(f"  {k}: {v} (tipo: {type(v).__name__})")
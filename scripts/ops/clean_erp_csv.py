@@ -9,7 +9,7 @@ import argparse
 import csv
 import re
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 PROCESS_PATTERN = re.compile(r"proceso\s+(?P<num>\d+)\s*-\s*(?P<label>[^-]+)", re.IGNORECASE)
 
@@ -50,6 +50,10 @@ def normalize_row(row: dict, articulo_col: str) -> Tuple[dict, bool]:
     if cod_art or not articulo_val:
         return row, False
 
+    # Descarte barato antes del regex: la mayoría de las filas no son procesos
+    if "proceso" not in articulo_val.lower():
+        return row, False
+
     match = PROCESS_PATTERN.search(articulo_val)
     if not match:
         return row, False
@@ -61,37 +65,48 @@ def normalize_row(row: dict, articulo_col: str) -> Tuple[dict, bool]:
     return row, True
 
 
-def load_rows(path: Path, encoding: str) -> Tuple[List[dict], str]:
-    with path.open("r", encoding=encoding, newline="") as handler:
-        reader = csv.DictReader(handler, delimiter=";")
-        articulo_col = find_articulo_column(reader.fieldnames or [])
-        rows = list(reader)
-    return rows, articulo_col
-
-
 def write_rows(path: Path, rows: Iterable[dict], headers: List[str], encoding: str) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("w", encoding=encoding, newline="") as handler:
-        writer = csv.DictWriter(handler, fieldnames=headers, delimiter=";")
+        # extrasaction="ignore" descarta columnas fuera de headers (p. ej.
+        # Articulo) sin copiar cada fila.
+        writer = csv.DictWriter(
+            handler, fieldnames=headers, delimiter=";", restval="", extrasaction="ignore"
+        )
         writer.writeheader()
-        for row in rows:
-            writer.writerow({key: row.get(key, "") for key in headers})
+        writer.writerows(rows)
 
 
 def main() -> None:
     args = parse_args()
-    rows, articulo_col = load_rows(args.input, args.encoding)
-    if not rows:
-        raise ValueError("El CSV no contiene filas para procesar")
-
-    updated_count = 0
-    for row in rows:
-        _, updated = normalize_row(row, articulo_col)
-        if updated:
-            updated_count += 1
-
-    output_headers = [col for col in rows[0].keys() if col != articulo_col]
-    write_rows(args.output, rows, output_headers, args.encoding)
+    # La salida se escribe mientras se lee la entrada: si fueran el mismo
+    # archivo, abrirlo para escritura lo truncaría antes de leerlo.
+    if args.output.resolve() == args.input.resolve():
+        raise ValueError("--output debe ser distinto de --input")
+    # Lectura, normalización y escritura en una sola pasada: las filas no se
+    # acumulan en memoria (pandas no es dependencia del proyecto).
+    with args.input.open("r", encoding=args.encoding, newline="") as handler:
+        reader = csv.DictReader(handler, delimiter=";")
+        articulo_col = find_articulo_column(reader.fieldnames or [])
+        first = next(reader, None)
+        if first is None:
+            raise ValueError("El CSV no contiene filas para procesar")
+
+        _, updated = normalize_row(first, articulo_col)
+        updated_count = int(updated)
+        # Encabezados de la primera fila ya normalizada, como antes: incluye
+        # CodArt/Descripcion si normalize_row los agregó.
+        output_headers = [col for col in first.keys() if col != articulo_col]
+
+        def normalized_rows() -> Iterator[dict]:
+            nonlocal updated_count
+            yield first
+            for row in reader:
+                _, updated = normalize_row(row, articulo_col)
+                updated_count += updated
+                yield row
+
+        write_rows(args.output, normalized_rows(), output_headers, args.encoding)
 
     print(
         "Archivo limpiado guardado en "
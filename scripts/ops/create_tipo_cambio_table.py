@@ -1,17 +1,21 @@
-"""Script para crear la tabla tipo_cambio_hist en la base de datos."""
+"""Script para crear la tabla tipo_cambio_hist en la base de datos.
+
+Es idempotente: si la tabla ya existe no se toca. Con --force se elimina y
+se recrea (se pierde el historial cargado).
+"""
+import argparse
 import sys
 from pathlib import Path
-from sqlalchemy import text
 
 # Agregar directorio raíz al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.db import _engine  # noqa: E402
 
-SQL_CREATE_TABLE = """
-DROP TABLE IF EXISTS tipo_cambio_hist;
+SQL_DROP_TABLE = "DROP TABLE IF EXISTS tipo_cambio_hist"
 
-CREATE TABLE tipo_cambio_hist (
+SQL_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS tipo_cambio_hist (
   id bigint(20) unsigned NOT NULL AUTO_INCREMENT,
   fecha date NOT NULL,
   moneda enum('ARS','USD','USD_MAY','EUR') NOT NULL,
@@ -23,43 +27,35 @@ CREATE TABLE tipo_cambio_hist (
   PRIMARY KEY (id),
   UNIQUE KEY uk_tc_moneda_fecha_tipo (moneda,fecha,tipo),
   KEY ix_tc_moneda_fecha (moneda,fecha),
+  KEY ix_tc_fecha (fecha),
   CONSTRAINT chk_tc_tasa CHECK (tasa > 0)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
 """
 
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Crea la tabla tipo_cambio_hist si no existe"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Elimina la tabla existente antes de crearla (borra los datos)",
+    )
+    return parser.parse_args()
+
+
 def main():
+    args = _parse_args()
+    # DDL sin parámetros: exec_driver_sql evita compilar/cachear la sentencia
     with _engine.begin() as conn:
-        # Ejecutar DROP
-        conn.execute(text("DROP TABLE IF EXISTS tipo_cambio_hist"))
-        print("✓ Tabla tipo_cambio_hist eliminada (si existía)")
-
-        # Ejecutar CREATE
-        create_sql = """
-        CREATE TABLE tipo_cambio_hist (
-          id bigint(20) unsigned NOT NULL AUTO_INCREMENT,
-          fecha date NOT NULL,
-          moneda enum('ARS','USD','USD_MAY','EUR') NOT NULL,
-          tipo enum('COMPRA','VENTA','PROMEDIO') NOT NULL DEFAULT 'PROMEDIO',
-          tasa decimal(18,6) NOT NULL,
-          origen enum('ERP_FLEXXUS','MANUAL','OTRO') NOT NULL DEFAULT 'MANUAL',
-          notas varchar(255) DEFAULT NULL,
-          fecha_creacion timestamp NOT NULL DEFAULT current_timestamp(),
-          PRIMARY KEY (id),
-          UNIQUE KEY uk_tc_moneda_fecha_tipo (moneda,fecha,tipo),
-          KEY ix_tc_moneda_fecha (moneda,fecha),
-          CONSTRAINT chk_tc_tasa CHECK (tasa > 0)
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """
-        conn.execute(text(create_sql))
-        print("✓ Tabla tipo_cambio_hist creada exitosamente")
+        if args.force:
+            conn.exec_driver_sql(SQL_DROP_TABLE)
+            print("✓ Tabla tipo_cambio_hist eliminada (si existía)")
 
-        # Verificar
-        result = conn.execute(text("SHOW TABLES LIKE 'tipo_cambio_hist'"))
-        if result.fetchone():
-            print("✓ Verificación: Tabla existe en la base de datos")
-        else:
-            print("✗ Error: La tabla no se encontró después de crearla")
+        # Un error de DDL sale como excepción; no hace falta SHOW TABLES
+        conn.exec_driver_sql(SQL_CREATE_TABLE)
+        print("✓ Tabla tipo_cambio_hist lista")
 
 
 if __name__ == "__main__":
@@ -11,12 +11,14 @@ from __future__ import annotations
 import argparse
 import csv
 import io
+import itertools
 import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime, date
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
 from sqlalchemy import text
 
@@ -27,12 +29,18 @@ except ImportError as exc:  # pragma: no cover - optional dependency guard
         "openpyxl is required. Install with `pip install openpyxl`."
     ) from exc
 
+try:
+    # Lector nativo (Rust); si no está instalado se usa openpyxl
+    from python_calamine import CalamineWorkbook  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency guard
+    CalamineWorkbook = None  # type: ignore
+
 # Ensure repository root is on sys.path so we can import app.*
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from app.db import SessionLocal  # type: ignore  # noqa: E402
+from app.db import _engine  # type: ignore  # noqa: E402
 
 TEMPLATE_COLUMNS = [
     "producto_codigo",
@@ -85,6 +93,7 @@ COLUMN_ALIASES = {
     "tipo_cambio": ["tipo_cambio", "tc", "cotizacion"],
 }
 
+OUTPUT_FORMATS = {".csv", ".xlsx"}
 DEFAULT_ORIGEN = "ERP_FLEXXUS"
 DEFAULT_MONEDA = "ARS"
 FALLBACK_PROV_CODIGO = "PROV_GENERICO"
@@ -115,19 +124,21 @@ DATETIME_FORMATS = (
     "%d/%m/%Y %I:%M %p",
     "%Y-%m-%d %H:%M:%S",
 )
+# Camino rápido de _to_date para los formatos anteriores
+_ISO_DATE_RE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
+_COMPACT_DATE_RE = re.compile(r"^(\d{4})(\d{2})(\d{2})$")
+_DMY_DATETIME_RE = re.compile(
+    r"^(\d{1,2})/(\d{1,2})/(\d{4})"
+    r"(?: (\d{1,2}):(\d{2})(?::(\d{2}))?(?: ([AP]M))?)?$"
+)
 
-RowDict = Dict[str, Any]
+# Filas posicionales: los valores se ubican por índice de columna
+Row = Sequence[Any]
+Table = tuple[List[str], Iterator[Row]]
 
 
-def _lower_keys(row: Mapping[Any, Any]) -> RowDict:
-    result: RowDict = {}
-    for key, value in row.items():
-        if key is None:
-            continue
-        trimmed_key = str(key).strip().lower()
-        cleaned_value = value.strip() if isinstance(value, str) else value
-        result[trimmed_key] = cleaned_value
-    return result
+def _normalize_headers(raw: Iterable[Any]) -> List[str]:
+    return [str(h).strip().lower() if h is not None else "" for h in raw]
 
 
 def _decode_csv_bytes(raw: bytes) -> str:
@@ -137,44 +148,96 @@ def _decode_csv_bytes(raw: bytes) -> str:
         return raw.decode("latin-1")
 
 
-def _read_csv(path: Path) -> List[RowDict]:
+def _detect_delimiter(content: str) -> str:
+    # El encabezado casi siempre decide; Sniffer (regex costosa) solo si empata
+    first_line = content.split("\n", 1)[0]
+    counts = sorted(
+        ((first_line.count(d), d) for d in (",", ";", "\t")), reverse=True
+    )
+    if counts[0][0] > counts[1][0]:
+        return counts[0][1]
+    try:
+        return csv.Sniffer().sniff(content[:4096], delimiters=",;\t").delimiter
+    except csv.Error:
+        return ","
+
+
+def _read_csv(path: Path) -> Table:
     content = path.read_bytes()
     if not content:
         raise ValueError("El archivo CSV está vacío")
-    text_stream = io.StringIO(_decode_csv_bytes(content))
-    sample = text_stream.read(2048)
-    text_stream.seek(0)
-    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
-    reader = csv.DictReader(text_stream, dialect=dialect)
-    return [_lower_keys(row) for row in reader]
+    decoded = _decode_csv_bytes(content)
+    reader = csv.reader(
+        io.StringIO(decoded), delimiter=_detect_delimiter(decoded)
+    )
+    headers = _normalize_headers(next(reader, []))
+    # Las líneas en blanco se saltean, como hacía DictReader
+    return headers, (raw for raw in reader if raw)
+
+
+def _calamine_value(cell: Any) -> Any:
+    # calamine entrega todo número como float; openpyxl devuelve int para
+    # enteros y los códigos numéricos deben seguir comparándose igual.
+    if isinstance(cell, float) and cell.is_integer():
+        return int(cell)
+    return cell
 
 
-def _read_xlsx(path: Path) -> List[RowDict]:
+def _iter_xlsx_values(path: Path) -> Iterator[Sequence[Any]]:
+    if CalamineWorkbook is not None:
+        try:
+            sheet = CalamineWorkbook.from_path(str(path)).get_sheet_by_index(0)
+            values = sheet.to_python(skip_empty_area=False)
+        except Exception:  # noqa: BLE001 - se reintenta con openpyxl
+            values = None
+        if values is not None:
+            for xl_row in values:
+                yield [_calamine_value(cell) for cell in xl_row]
+            return
+
     wb = openpyxl.load_workbook(path, read_only=True)
-    ws = wb.active
-    if ws is None:
-        raise ValueError("El archivo XLSX no tiene hojas activas")
     try:
-        headers = [
-            str(c.value).strip().lower() if c.value is not None else ""
-            for c in next(ws.iter_rows(min_row=1, max_row=1))
-        ]
-    except StopIteration:
-        return []
-    rows: List[RowDict] = []
-    for xl_row in ws.iter_rows(min_row=2, values_only=True):
-        row_dict: RowDict = {}
-        for idx, cell in enumerate(xl_row):
-            key = headers[idx] if idx < len(headers) else f"col_{idx}"
-            row_dict[key] = cell
-        rows.append(_lower_keys(row_dict))
-    return rows
-
-
-def _resolve_value(row: RowDict, field: str) -> Optional[Any]:
-    for alias in COLUMN_ALIASES.get(field, [field]):
-        if alias in row and row[alias] not in (None, ""):
-            return row[alias]
+        ws = wb.active
+        if ws is None:
+            raise ValueError("El archivo XLSX no tiene hojas activas")
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _read_xlsx(path: Path) -> Table:
+    # El libro queda abierto hasta agotar las filas (lo cierra el finally de
+    # _iter_xlsx_values)
+    xl_rows = _iter_xlsx_values(path)
+    first = next(xl_rows, None)
+    if first is None:
+        return [], iter(())
+    return _normalize_headers(first), xl_rows
+
+
+def _field_indexes(headers: Sequence[str]) -> Dict[str, tuple[int, ...]]:
+    """Por campo, los índices de las columnas que lo alimentan, en orden de
+    alias. Se calcula una vez por archivo; por fila solo se indexa.
+    """
+    # Con encabezados repetidos vale la última columna, como en un dict
+    position = {header: idx for idx, header in enumerate(headers)}
+    return {
+        field: tuple(position[alias] for alias in aliases if alias in position)
+        for field, aliases in COLUMN_ALIASES.items()
+    }
+
+
+def _resolve_value(row: Row, indexes: tuple[int, ...]) -> Optional[Any]:
+    # Las filas llegan crudas: solo se limpian las celdas que se consultan,
+    # no las decenas de columnas de la exportación que no se usan
+    n_values = len(row)
+    for idx in indexes:
+        if idx < n_values:
+            value = row[idx]
+            if isinstance(value, str):
+                value = value.strip()
+            if value not in (None, ""):
+                return value
     return None
 
 
@@ -205,17 +268,50 @@ def _normalize_datetime_text(raw: str) -> str:
     )
 
 
+def _match_date(cleaned: str) -> Optional[date]:
+    """Formatos habituales sin pasar por strptime; None si no encaja."""
+    match = _ISO_DATE_RE.match(cleaned) or _COMPACT_DATE_RE.match(cleaned)
+    if match:
+        year, month, day = match.groups()
+        return date(int(year), int(month), int(day))
+    match = _DMY_DATETIME_RE.match(cleaned)
+    if not match:
+        return None
+    day, month, year, hour, minute, second, meridian = match.groups()
+    if hour is not None:
+        h = int(hour)
+        if not (1 <= h <= 12 if meridian else h <= 23):
+            raise ValueError("hora fuera de rango")
+        if int(minute) > 59 or int(second or 0) > 59:
+            raise ValueError("minutos/segundos fuera de rango")
+    return date(int(year), int(month), int(day))
+
+
 def _to_date(value: object) -> Optional[date]:
     if value is None:
         return None
-    if isinstance(value, date):
-        return value
+    # datetime es subclase de date: se evalúa primero
     if isinstance(value, datetime):
         return value.date()
+    if isinstance(value, date):
+        return value
     value_str = str(value).strip()
     if not value_str:
         return None
+    return _parse_date_text(value_str)
+
+
+# Las exportaciones repiten mucho la misma fecha (una por OC): se memoiza
+@lru_cache(maxsize=8192)
+def _parse_date_text(value_str: str) -> Optional[date]:
     cleaned = _normalize_datetime_text(value_str)
+    try:
+        parsed = _match_date(cleaned)
+    except ValueError:
+        # Fecha/hora imposible: strptime también la rechazaría
+        return None
+    if parsed is not None:
+        return parsed
     for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(cleaned, fmt).date()
@@ -232,13 +328,20 @@ def _to_date(value: object) -> Optional[date]:
 def _to_float(value: object) -> Optional[float]:
     if value is None:
         return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return _parse_float_text(str(value))
+
+
+@lru_cache(maxsize=8192)
+def _parse_float_text(value_str: str) -> Optional[float]:
     try:
-        return float(str(value).replace(",", "."))
+        return float(value_str.replace(",", "."))
     except ValueError:
         return None
 
 
-@dataclass
+@dataclass(slots=True)
 class CleansedRow:
     producto_codigo: str
     proveedor_codigo: str
@@ -250,38 +353,61 @@ class CleansedRow:
     referencia_doc: Optional[str]
     notas: Optional[str]
 
-    def as_list(self) -> List[object]:
-        return [
+    def as_tuple(self) -> tuple[object, ...]:
+        # Tupla en el orden de TEMPLATE_COLUMNS, lista para csv/openpyxl
+        return (
             self.producto_codigo,
             self.proveedor_codigo,
             self.proveedor_nombre or "",
             self.fecha_precio.isoformat(),
-            f"{self.precio_unitario:.6f}",
+            # float nativo: celda numérica en XLSX y repr más corto en CSV
+            self.precio_unitario,
             self.moneda,
             self.origen,
             self.referencia_doc or "",
             self.notas or "",
-        ]
+        )
 
 
-def load_product_codes() -> set[str]:
-    with SessionLocal() as session:
-        rows = session.execute(
-            text("SELECT codigo FROM producto")
-        )  # type: ignore[name-defined]
-        return {row[0] for row in rows}
+def load_product_codes() -> frozenset[str]:
+    # Conexión Core (sin Session) y cursor del lado del servidor: los
+    # códigos se consumen por lotes sin armar todo el resultado en el cliente
+    with _engine.connect() as conn:
+        result = conn.execute(
+            text("SELECT codigo FROM producto").execution_options(
+                yield_per=10000
+            )
+        )
+        return frozenset(result.scalars())
 
 
 def cleanse_rows(
-    rows: Iterable[RowDict],
-    product_codes: set[str],
+    headers: Sequence[str],
+    rows: Iterable[Row],
+    product_codes: frozenset[str],
     default_proveedor_codigo: str,
     default_proveedor_nombre: str,
-) -> tuple[List[CleansedRow], List[str]]:
-    cleansed: List[CleansedRow] = []
-    rejected: List[str] = []
+    rejected: List[str],
+) -> Iterator[CleansedRow]:
+    """Genera las filas válidas; los motivos de descarte van a ``rejected``."""
+    # Los índices de cada campo se resuelven una vez desde el encabezado y
+    # quedan en locales para el loop.
+    columns = _field_indexes(headers)
+    col_codigo = columns["producto_codigo"]
+    col_prov_codigo = columns["proveedor_codigo"]
+    col_prov_nombre = columns["proveedor_nombre"]
+    col_fecha = columns["fecha_precio"]
+    col_precio = columns["precio_unitario"]
+    col_moneda = columns["moneda"]
+    col_origen = columns["origen"]
+    col_referencia = columns["referencia_doc"]
+    col_notas = columns["notas"]
+    col_tipo_cambio = columns["tipo_cambio"]
+    # Pocas monedas distintas por archivo: se normaliza cada valor una vez
+    monedas: Dict[Any, Optional[str]] = {}
+
     for idx, row in enumerate(rows, start=2):
-        codigo = _resolve_value(row, "producto_codigo")
+        codigo = _resolve_value(row, col_codigo)
         if not codigo:
             rejected.append(f"Fila {idx}: producto_codigo vacío")
             continue
@@ -292,79 +418,91 @@ def cleanse_rows(
             )
             continue
 
-        proveedor_codigo = _resolve_value(row, "proveedor_codigo")
-        if not proveedor_codigo:
-            proveedor_codigo = default_proveedor_codigo
-            proveedor_nombre = (
-                _resolve_value(row, "proveedor_nombre")
-                or default_proveedor_nombre
-            )
-        else:
-            proveedor_nombre = (
-                _resolve_value(row, "proveedor_nombre")
-                or default_proveedor_nombre
-            )
+        proveedor_codigo = (
+            _resolve_value(row, col_prov_codigo) or default_proveedor_codigo
+        )
+        proveedor_nombre = (
+            _resolve_value(row, col_prov_nombre) or default_proveedor_nombre
+        )
 
-        fecha_precio = _to_date(_resolve_value(row, "fecha_precio"))
+        fecha_precio = _to_date(_resolve_value(row, col_fecha))
         if not fecha_precio:
             rejected.append(f"Fila {idx}: fecha_precio inválida")
             continue
 
-        precio_unitario = _to_float(_resolve_value(row, "precio_unitario"))
+        precio_unitario = _to_float(_resolve_value(row, col_precio))
         if not precio_unitario or precio_unitario <= 0:
             rejected.append(f"Fila {idx}: precio_unitario inválido")
             continue
 
-        moneda_raw = _resolve_value(row, "moneda")
-        moneda = _normalize_moneda(moneda_raw, DEFAULT_MONEDA)
+        moneda_raw = _resolve_value(row, col_moneda)
+        if moneda_raw in monedas:
+            moneda = monedas[moneda_raw]
+        else:
+            moneda = monedas[moneda_raw] = _normalize_moneda(
+                moneda_raw, DEFAULT_MONEDA
+            )
         if not moneda:
             rejected.append(
                 f"Fila {idx}: moneda inválida ({moneda_raw or ''})"
             )
             continue
-        origen = str(_resolve_value(row, "origen") or DEFAULT_ORIGEN).upper()
-        referencia = _resolve_value(row, "referencia_doc")
-        notas_raw = _resolve_value(row, "notas")
-        tipo_cambio = _resolve_value(row, "tipo_cambio")
+        origen = str(_resolve_value(row, col_origen) or DEFAULT_ORIGEN).upper()
+        referencia = _resolve_value(row, col_referencia)
+        notas_raw = _resolve_value(row, col_notas)
+        tipo_cambio = _resolve_value(row, col_tipo_cambio)
         notas = str(notas_raw) if notas_raw else ""
         if tipo_cambio not in (None, ""):
             notas = (notas + " ").strip()
             notas = f"{notas}TC={tipo_cambio}".strip()
 
-        cleansed.append(
-            CleansedRow(
-                producto_codigo=codigo_str,
-                proveedor_codigo=str(proveedor_codigo).strip(),
-                proveedor_nombre=(
-                    str(proveedor_nombre).strip() if proveedor_nombre else None
-                ),
-                fecha_precio=fecha_precio,
-                precio_unitario=precio_unitario,
-                moneda=moneda,
-                origen=origen,
-                referencia_doc=str(referencia).strip() if referencia else None,
-                notas=notas or None,
-            )
+        yield CleansedRow(
+            producto_codigo=codigo_str,
+            proveedor_codigo=str(proveedor_codigo).strip(),
+            proveedor_nombre=(
+                str(proveedor_nombre).strip() if proveedor_nombre else None
+            ),
+            fecha_precio=fecha_precio,
+            precio_unitario=precio_unitario,
+            moneda=moneda,
+            origen=origen,
+            referencia_doc=str(referencia).strip() if referencia else None,
+            notas=notas or None,
         )
-    return cleansed, rejected
 
 
-def write_output(rows: List[CleansedRow], destination: Path) -> None:
-    if destination.suffix.lower() == ".xlsx":
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        if ws is None:
-            raise ValueError("No se pudo crear la hoja activa en el XLSX")
-        ws.append(TEMPLATE_COLUMNS)
+def _write_xlsx(rows: Iterable[Sequence[object]], destination: Path) -> None:
+    # write_only: las filas se vuelcan al XML sin armar el árbol de celdas
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(TEMPLATE_COLUMNS)
+    for values in rows:
+        ws.append(values)
+    wb.save(destination)
+
+
+def _write_csv(rows: Iterable[Sequence[object]], destination: Path) -> None:
+    with destination.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(TEMPLATE_COLUMNS)
+        writer.writerows(rows)
+
+
+def write_output(rows: Iterable[CleansedRow], destination: Path) -> int:
+    """Escribe las filas a medida que llegan; devuelve cuántas escribió."""
+    written = 0
+
+    def values() -> Iterator[tuple[object, ...]]:
+        nonlocal written
         for row in rows:
-            ws.append(row.as_list())
-        wb.save(destination)
+            written += 1
+            yield row.as_tuple()
+
+    if destination.suffix.lower() == ".xlsx":
+        _write_xlsx(values(), destination)
     else:
-        with destination.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(TEMPLATE_COLUMNS)
-            for row in rows:
-                writer.writerow(row.as_list())
+        _write_csv(values(), destination)
+    return written
 
 
 def parse_args() -> argparse.Namespace:
@@ -381,7 +519,10 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--output",
         default="precios_importables.xlsx",
-        help="Ruta del archivo de salida (CSV o XLSX)",
+        help=(
+            "Ruta del archivo de salida (.csv o .xlsx, los formatos que acepta "
+            "/api/precios/import; CSV es el más liviano de generar)"
+        ),
     )
     parser.add_argument(
         "--default-proveedor-codigo",
@@ -402,31 +543,40 @@ def main() -> None:
     output_path = Path(args.output)
     if not input_path.exists():
         raise SystemExit(f"No se encontró el archivo {input_path}")
+    # Se valida antes de leer: el importador solo acepta estas extensiones
+    if output_path.suffix.lower() not in OUTPUT_FORMATS:
+        raise SystemExit("Formato de salida no soportado. Use .csv o .xlsx")
 
     if input_path.suffix.lower() == ".csv":
-        raw_rows = _read_csv(input_path)
+        headers, raw_rows = _read_csv(input_path)
     elif input_path.suffix.lower() in {".xlsx", ".xls"}:
-        raw_rows = _read_xlsx(input_path)
+        headers, raw_rows = _read_xlsx(input_path)
     else:
         raise SystemExit("Formato no soportado. Use CSV o XLSX")
 
     product_codes = load_product_codes()
-    cleansed, rejected = cleanse_rows(
+    # Lectura, limpieza y escritura encadenadas: ninguna etapa materializa
+    # todas las filas
+    rejected: List[str] = []
+    cleansed = cleanse_rows(
+        headers,
         raw_rows,
         product_codes,
         args.default_proveedor_codigo,
         args.default_proveedor_nombre,
+        rejected,
     )
 
-    if not cleansed:
+    first = next(cleansed, None)
+    if first is None:
         raise SystemExit(
             "No hay filas válidas para exportar. Revise los errores: \n"
             + "\n".join(rejected[:20])
         )
 
-    write_output(cleansed, output_path)
+    written = write_output(itertools.chain((first,), cleansed), output_path)
 
-    print(f"Generado {output_path} con {len(cleansed)} filas válidas")
+    print(f"Generado {output_path} con {written} filas válidas")
     if rejected:
         print(f"Se descartaron {len(rejected)} filas:")
         for err in rejected[:20]:
@@ -34,14 +34,15 @@ def _parse_args() -> argparse.Namespace:
 
 def main() -> None:
     args = _parse_args()
-    db = SessionLocal()
     try:
-        resumen = sync_bcra_tipos_cambio(
-            db,
-            desde=args.desde,
-            hasta=args.hasta,
-        )
-        db.commit()
+        # Una sola transacción: commit al salir del bloque, rollback ante
+        # cualquier excepción (no solo TipoCambioSyncError).
+        with SessionLocal() as db, db.begin():
+            resumen = sync_bcra_tipos_cambio(
+                db,
+                desde=args.desde,
+                hasta=args.hasta,
+            )
         print(
             "Sincronización completada: "
             f"{resumen.insertados} insertados, "
@@ -50,11 +51,8 @@ def main() -> None:
             f"(rango {resumen.desde} -> {resumen.hasta})"
         )
     except TipoCambioSyncError as exc:
-        db.rollback()
         print(f"Error: {exc}")
         sys.exit(1)
-    finally:
-        db.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def sqlite_db():
+    """Session sobre SQLite en memoria para probar SQL portable.
+
+    PARSE_DECLTYPES convierte las columnas DATE a datetime.date, como
+    PyMySQL con MySQL.
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"detect_types": sqlite3.PARSE_DECLTYPES},
+    )
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
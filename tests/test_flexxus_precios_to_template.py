@@ -0,0 +1,114 @@
+import csv
+import importlib.util
+import io
+import itertools
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+_SCRIPT = (
+    Path(__file__).resolve().parents[1]
+    / "scripts" / "ops" / "flexxus_precios_to_template.py"
+)
+_spec = importlib.util.spec_from_file_location("flexxus_precios_to_template", _SCRIPT)
+flexxus = importlib.util.module_from_spec(_spec)
+# dataclasses resuelve el módulo de la clase en sys.modules
+sys.modules[_spec.name] = flexxus
+_spec.loader.exec_module(flexxus)
+
+
+def _strptime_chain(value: str):
+    """Parser de fechas anterior al camino rápido por regex."""
+    cleaned = flexxus._normalize_datetime_text(value)
+    for fmt in flexxus.DATE_FORMATS + flexxus.DATETIME_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _fechas_generadas():
+    for d, m, y in itertools.product(
+        ["1", "01", "29", "31", "32", "00"], ["2", "02", "12", "13"], ["2023", "2024"]
+    ):
+        yield f"{y}-{m}-{d}"
+        base = f"{d}/{m}/{y}"
+        yield base
+        for hh, mm, ss, mer in itertools.product(
+            ["0", "7", "12", "13", "23", "24"],
+            ["00", "5", "59", "60"],
+            [None, "00", "59", "60", "61"],
+            [None, "AM", "p.m."],
+        ):
+            yield f"{base} {hh}:{mm}" + (f":{ss}" if ss else "") + (f" {mer}" if mer else "")
+    yield from ["20240229", "20230229", "2024-03-05 10:00:00", "05/03/2024\xa010:00"]
+
+
+def test_parse_date_text_igual_a_strptime():
+    for value in _fechas_generadas():
+        assert flexxus._parse_date_text(value) == _strptime_chain(value), value
+
+
+def test_to_date_descarta_la_hora_de_un_datetime():
+    assert flexxus._to_date(datetime(2024, 3, 5, 10, 30)) == date(2024, 3, 5)
+    assert flexxus._to_date("05/03/2024 10:00:61") is None
+
+
+def _resolver_con_dictreader(content: str):
+    """Lectura anterior: DictReader + claves en minúscula + alias por nombre."""
+    dialect = csv.Sniffer().sniff(content[:2048], delimiters=",;\t")
+    resultado = []
+    for row in csv.DictReader(io.StringIO(content), dialect=dialect):
+        limpio = {
+            str(k).strip().lower(): v.strip() if isinstance(v, str) else v
+            for k, v in row.items()
+            if k is not None
+        }
+        resultado.append(
+            {
+                field: next(
+                    (
+                        limpio[alias]
+                        for alias in aliases
+                        if limpio.get(alias) not in (None, "")
+                    ),
+                    None,
+                )
+                for field, aliases in flexxus.COLUMN_ALIASES.items()
+            }
+        )
+    return resultado
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "Codigo_Articulo;Fecha;Precio;Moneda;Proveedor\n"
+        + "A1; 05/03/2024 ;10,5;U$S;P1\n" * 20
+        + "\nB2;2024-03-06;3\nC3;2024-03-07;4;$;P2;extra\n",
+        "producto_codigo,fecha_precio,precio_unitario,moneda,notas\n"
+        + 'A1,2024-03-05,1.5,ARS,"con, coma"\n' * 5,
+    ],
+)
+def test_read_csv_igual_a_dictreader(tmp_path, content):
+    path = tmp_path / "precios.csv"
+    path.write_text(content, encoding="utf-8")
+
+    headers, rows = flexxus._read_csv(path)
+    indexes = flexxus._field_indexes(headers)
+    resueltas = [
+        {field: flexxus._resolve_value(row, idx) for field, idx in indexes.items()}
+        for row in rows
+    ]
+
+    assert resueltas == _resolver_con_dictreader(content)
+
+
+def test_to_float_rechaza_booleanos():
+    assert flexxus._to_float(True) is None
+    assert flexxus._to_float(False) is None
+    assert flexxus._to_float(3) == 3.0
+    assert flexxus._to_float("10,5") == 10.5
@@ -0,0 +1,248 @@
+import csv
+import io
+import itertools
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import UploadFile
+from openpyxl import Workbook
+from sqlalchemy import text
+
+from app.services import precio_service
+from app.services.precio_service import (
+    _parse_csv_rows,
+    _parse_fecha_precio,
+    _parse_xlsx_rows,
+    _to_precio_row,
+    importar_precios_desde_archivo,
+    listar_precios_compra,
+)
+
+
+def _strptime_chain(value):
+    """Parser de fechas anterior al camino rápido por regex."""
+    cleaned = precio_service._normalize_datetime_text(str(value).strip())
+    for fmt in precio_service.DATE_FORMATS + precio_service.DATETIME_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _fechas_generadas():
+    for d, m, y in itertools.product(
+        ["1", "01", "29", "31", "32", "00"], ["2", "02", "12", "13"], ["2023", "2024"]
+    ):
+        for base in (f"{d}/{m}/{y}", f"{y}-{m}-{d}"):
+            yield base
+            for hh, mm, ss, mer in itertools.product(
+                ["0", "7", "12", "13", "24"],
+                ["00", "5", "60"],
+                [None, "59", "61"],
+                [None, "AM", "p.m."],
+            ):
+                hora = f"{hh}:{mm}" + (f":{ss}" if ss else "") + (f" {mer}" if mer else "")
+                yield f"{base} {hora}"
+                yield f"{base}T{hora}"
+    yield from ["20240229", "20230229", " 05/03/2024 ", "2024-03-05\xa010:00:00"]
+
+
+def test_parse_fecha_precio_igual_a_strptime():
+    for value in _fechas_generadas():
+        assert _parse_fecha_precio(value) == _strptime_chain(value), value
+
+
+def test_parse_fecha_precio_rechaza_hora_invalida():
+    assert _parse_fecha_precio("01/02/2024 99:99") is None
+    assert _parse_fecha_precio("01/02/2024 10:30") == date(2024, 2, 1)
+    assert _parse_fecha_precio(datetime(2024, 2, 1, 10, 30)) == date(2024, 2, 1)
+
+
+def _dictreader_rows(content: bytes):
+    """Parseo anterior: DictReader + normalización de claves por fila."""
+    decoded = precio_service._decode_csv_content(content)
+    dialect = csv.Sniffer().sniff(decoded[:2048], delimiters=",;\t")
+    rows = []
+    for row in csv.DictReader(io.StringIO(decoded), dialect=dialect):
+        rows.append(
+            {
+                str(k).strip().lower(): v.strip() if isinstance(v, str) else v
+                for k, v in row.items()
+                if k is not None
+            }
+        )
+    return rows
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        # filas corta y larga al final: Sniffer necesita una muestra regular
+        b"producto_codigo;fecha_precio;precio_unitario;moneda\n"
+        + b"A1; 01/02/2024 ;10,5;ARS\n" * 20
+        + b"\nB2;2024-02-01;3;USD;extra\nC3;2024-02-02\n",
+        "﻿Producto_Codigo,Fecha_Precio,Precio_Unitario,Moneda,Notas\n"
+        "A1,2024-01-01,1.5,ARS,\"con, coma\"\n".encode("utf-8"),
+        "producto_codigo\tfecha_precio\tprecio_unitario\tmoneda\n"
+        "ÑU\t2024-01-01\t2\tARS\n".encode("latin-1"),
+    ],
+)
+def test_parse_csv_rows_igual_a_dictreader(content):
+    headers, rows = _parse_csv_rows(content)
+    esperadas = _dictreader_rows(content)
+    assert "producto_codigo" in headers
+    assert [_to_precio_row(r) for r in rows] == [
+        _to_precio_row(r) for r in esperadas
+    ]
+
+
+def test_parse_xlsx_rows_normaliza_encabezados_y_texto():
+    wb = Workbook()
+    ws = wb.active
+    ws.append([" Producto_Codigo ", "FECHA_PRECIO", "precio_unitario", "moneda"])
+    ws.append([" A1 ", datetime(2024, 2, 1), 10.5, "ars "])
+    ws.append(["B2", "01/02/2024", "3", None])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    headers, rows = _parse_xlsx_rows(buf.getvalue())
+    rows = list(rows)
+
+    assert headers == ["producto_codigo", "fecha_precio", "precio_unitario", "moneda"]
+    assert rows[0] == {
+        "producto_codigo": "A1",
+        "fecha_precio": datetime(2024, 2, 1),
+        "precio_unitario": 10.5,
+        "moneda": "ars",
+    }
+    assert rows[1]["moneda"] is None
+
+
+class _FakePrecioDB:
+    """Session mínima: catálogo de productos y tabla de precios en memoria."""
+
+    def __init__(self, productos, precios=()):
+        self.productos = productos
+        self.precios = {}
+        for fila in precios:
+            self._insert(fila)
+        self.commits = 0
+
+    def _insert(self, fila):
+        new_id = len(self.precios) + 1
+        self.precios[new_id] = dict(
+            zip(
+                (
+                    "producto_id", "proveedor_codigo", "proveedor_nombre",
+                    "fecha_precio", "precio_unitario", "moneda", "origen",
+                    "referencia_doc", "notas",
+                ),
+                fila,
+            )
+        )
+
+    def execute(self, stmt, params=None):
+        if stmt is precio_service.SQL_PRODUCTO_IDS:
+            return [SimpleNamespace(codigo=c, id=i) for c, i in self.productos.items()]
+        assert stmt is precio_service.SQL_LOOKUP_PRECIOS_LOTE
+        return [
+            SimpleNamespace(id=pid, **p)
+            for pid, p in self.precios.items()
+            if p["producto_id"] in params["pids"]
+            and p["fecha_precio"] in params["fechas"]
+        ]
+
+    def scalar(self, stmt, params):
+        return None
+
+    def connection(self):
+        return SimpleNamespace(connection=self)
+
+    def cursor(self):
+        return self
+
+    def executemany(self, sql, rows):
+        if sql is precio_service.RAW_INSERT_PRECIO:
+            for fila in rows:
+                self._insert(fila)
+        else:
+            for precio, prov_nom, origen, ref, notas, pid in rows:
+                self.precios[pid].update(precio_unitario=precio, proveedor_nombre=prov_nom)
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def _upload(content: str) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content.encode("utf-8")), filename="p.csv")
+
+
+def test_importar_precios_cuenta_insertados_y_actualizados(monkeypatch):
+    monkeypatch.setattr(precio_service, "IMPORT_BATCH_SIZE", 2)
+    db = _FakePrecioDB(
+        {"A1": 1, "B2": 2},
+        precios=[(1, "Próv ", "x", date(2024, 1, 1), 1.0, "ARS", "MANUAL", None, None)],
+    )
+    archivo = _upload(
+        "producto_codigo,proveedor_codigo,fecha_precio,precio_unitario,moneda\n"
+        # misma clave que la fila existente según la collation de MySQL
+        "A1,PROV,2024-01-01,2,ARS\n"
+        "B2,P1,2024-01-01,3,ARS\n"
+        # ya escrita por el lote anterior y repetida dentro de este lote
+        "B2,p1,2024-01-01,4,ARS\n"
+        "B2,P1,2024-01-01,5,ARS\n"
+        "A1,P2,2024-01-02,6,USD\n"
+        "ZZ,P1,2024-01-02,7,USD\n"  # producto inexistente
+        "A1,P2,31/02/2024,8,USD\n"  # fecha imposible
+    )
+
+    result = importar_precios_desde_archivo(db, archivo)
+
+    assert (result.insertados, result.actualizados, result.rechazados) == (2, 3, 2)
+    assert len(db.precios) == 1 + result.insertados
+    assert db.precios[1]["precio_unitario"] == 2.0
+    assert sorted(p["precio_unitario"] for p in db.precios.values()) == [2.0, 5.0, 6.0]
+    assert db.commits == 1
+
+
+def test_listar_precios_keyset_recorre_todo_sin_repetir(sqlite_db):
+    sqlite_db.execute(text("CREATE TABLE producto (id INTEGER PRIMARY KEY, codigo TEXT, nombre TEXT)"))
+    sqlite_db.execute(
+        text(
+            "CREATE TABLE precio_compra_hist (id INTEGER PRIMARY KEY, producto_id INTEGER, "
+            "proveedor_codigo TEXT, proveedor_nombre TEXT, fecha_precio DATE, "
+            "precio_unitario REAL, moneda TEXT, origen TEXT, referencia_doc TEXT, notas TEXT)"
+        )
+    )
+    sqlite_db.execute(text("INSERT INTO producto VALUES (1, 'A1', 'Producto A')"))
+    for i, dia in enumerate([3, 1, 3, 2, 3, 1, 2], start=1):
+        sqlite_db.execute(
+            text(
+                "INSERT INTO precio_compra_hist VALUES "
+                "(:id, 1, 'P', 'Prov', :f, :p, 'ARS', 'MANUAL', NULL, NULL)"
+            ),
+            {"id": i, "f": date(2024, 1, dia), "p": float(i)},
+        )
+
+    completo = listar_precios_compra(sqlite_db, limit=100)
+    paginas, after = [], None
+    while True:
+        # con cursor, offset se ignora
+        offset = 0 if after is None else 99
+        pagina = listar_precios_compra(sqlite_db, limit=3, offset=offset, after=after)
+        if not pagina:
+            break
+        paginas.extend(pagina)
+        ultima = pagina[-1]
+        after = (date.fromisoformat(ultima["fecha_precio"]), ultima["id"])
+
+    assert [p["id"] for p in completo] == [5, 3, 1, 7, 4, 6, 2]
+    assert paginas == completo
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import text
+
+from app.services import producto_service
+
+
+def test_cache_de_productos_se_limpia_al_confirmar(sqlite_db):
+    producto_service._PRODUCTOS_CACHE.set("k", [{"id": 1}])
+
+    producto_service._invalidar_al_confirmar(sqlite_db)
+    # Antes del commit otra request todavía ve el catálogo confirmado.
+    assert producto_service._PRODUCTOS_CACHE.get("k") == [{"id": 1}]
+
+    sqlite_db.commit()
+    assert producto_service._PRODUCTOS_CACHE.get("k") is None
+
+
+def test_rollback_no_limpia_el_cache(sqlite_db):
+    producto_service._PRODUCTOS_CACHE.set("k", [{"id": 1}])
+    sqlite_db.execute(text("SELECT 1"))  # abre la transacción, como un INSERT
+
+    producto_service._invalidar_al_confirmar(sqlite_db)
+    sqlite_db.rollback()
+    sqlite_db.commit()
+
+    assert producto_service._PRODUCTOS_CACHE.get("k") == [{"id": 1}]
+    producto_service.invalidar_cache_productos()
+
+
+def test_codigo_duplicado_sin_indice_unico(sqlite_db):
+    # Sin uk en producto.codigo: el chequeo previo rechaza el duplicado.
+    sqlite_db.execute(text("CREATE TABLE unidad_medida (id INTEGER PRIMARY KEY)"))
+    sqlite_db.execute(text("INSERT INTO unidad_medida VALUES (1)"))
+    sqlite_db.execute(
+        text(
+            "CREATE TABLE producto (id INTEGER PRIMARY KEY, codigo TEXT, "
+            "nombre TEXT, tipo_producto TEXT, rubro TEXT, "
+            "unidad_medida_id INTEGER, activo INTEGER)"
+        )
+    )
+    tipo = next(iter(producto_service.TIPO_VALUES))
+    a = producto_service.crear_producto(sqlite_db, "A1", "A", tipo, None, 1)
+    b = producto_service.crear_producto(sqlite_db, "B2", "B", tipo, None, 1)
+
+    with pytest.raises(ValueError, match="ya existe"):
+        producto_service.crear_producto(sqlite_db, "A1", "Otro", tipo, None, 1)
+    with pytest.raises(ValueError, match="ya existe"):
+        producto_service.actualizar_producto(
+            sqlite_db, b["id"], "A1", "B", tipo, None, 1, True
+        )
+    # Conservar el propio código no es un duplicado.
+    producto_service.actualizar_producto(
+        sqlite_db, a["id"], "A1", "A nuevo", tipo, None, 1, True
+    )
+    sqlite_db.rollback()
@@ -0,0 +1,185 @@
+import csv
+import io
+
+import pytest
+from fastapi import UploadFile
+from openpyxl import Workbook
+from sqlalchemy import text
+
+from app.services.stock_import_service import (
+    _parse_csv,
+    importar_stock_csv_o_excel,
+    listar_stock_periodo,
+)
+from app.utils.collation import clave_collation
+
+
+def _comparar_collation(a: str, b: str) -> int:
+    a, b = clave_collation(a), clave_collation(b)
+    return (a > b) - (a < b)
+
+
+@pytest.fixture
+def stock_db(sqlite_db):
+    # codigo compara como utf8mb4_unicode_ci, igual que el IN (...) en MySQL
+    sqlite_db.connection().connection.driver_connection.create_collation(
+        "mysql_ci", _comparar_collation
+    )
+    sqlite_db.execute(
+        text(
+            "CREATE TABLE producto (id INTEGER PRIMARY KEY, "
+            "codigo TEXT COLLATE mysql_ci, nombre TEXT, activo INTEGER)"
+        )
+    )
+    sqlite_db.execute(
+        text(
+            "CREATE TABLE stock_disponible_mes (id INTEGER PRIMARY KEY, "
+            "anio INTEGER, mes INTEGER, producto_id INTEGER, "
+            "stock_disponible REAL, fecha_corte TEXT, origen TEXT)"
+        )
+    )
+    for pid, codigo in enumerate(["A1", "B2", "C3", "D4", "E5"], start=1):
+        sqlite_db.execute(
+            text("INSERT INTO producto VALUES (:id, :c, :n, 1)"),
+            {"id": pid, "c": codigo, "n": f"Producto {codigo}"},
+        )
+    return sqlite_db
+
+
+def _csv(content: str) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content.encode("utf-8")), filename="s.csv")
+
+
+def _stock(db):
+    return dict(
+        db.execute(
+            text(
+                "SELECT producto_id, stock_disponible FROM stock_disponible_mes "
+                "WHERE anio=2024 AND mes=5 ORDER BY producto_id"
+            )
+        ).all()
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "Producto_Codigo;Stock_Disponible;Extra\n" + "A1; 10,5 ;x\n" * 20
+        + "\nB2;3\nC3;4;y;z\n",
+        "codigo,cantidad\n" + 'A1,"1,5"\n' * 5 + "B2, 7 \n",
+    ],
+)
+def test_parse_csv_igual_a_dictreader(content):
+    headers, rows = _parse_csv(io.BytesIO(content.encode("utf-8")))
+
+    dialect = csv.Sniffer().sniff(content[:2048], delimiters=",;\t")
+    esperadas = list(csv.DictReader(io.StringIO(content), dialect=dialect))
+
+    assert headers == [h.strip().lower() for h in esperadas[0].keys() if h]
+    assert len(rows) == len(esperadas)
+    for row, esperada in zip(rows, esperadas):
+        for original in esperada.keys() - {None}:
+            valor = esperada[original]
+            assert row.get(original.strip().lower()) == (
+                valor.strip() if valor is not None else None
+            )
+
+
+def test_importar_stock_cuenta_insertados_y_actualizados(stock_db):
+    stock_db.execute(
+        text(
+            "INSERT INTO stock_disponible_mes VALUES "
+            "(1, 2024, 5, 1, 1, '2024-05-01', 'ERP_FLEXXUS')"
+        )
+    )
+    contenido = (
+        "producto_codigo,stock_disponible\n"
+        "A1,10\n"  # ya existía en el período
+        "B2,5\n"
+        "B2,6\n"  # repetido en el archivo: gana la última fila
+        "ZZ,1\n"
+        "C3,abc\n"
+        "D4,-1\n"
+        "E5,nan\n"
+        ",3\n"
+    )
+
+    result = importar_stock_csv_o_excel(stock_db, 2024, 5, _csv(contenido), "2024-05-31")
+
+    assert (result.insertados, result.actualizados, result.rechazados) == (1, 2, 5)
+    assert _stock(stock_db) == {1: 10.0, 2: 6.0}
+
+    # Reimportar el mismo archivo actualiza sin duplicar filas.
+    result = importar_stock_csv_o_excel(stock_db, 2024, 5, _csv(contenido), "2024-05-31")
+    assert (result.insertados, result.actualizados) == (0, 3)
+    total = stock_db.execute(text("SELECT COUNT(*) FROM stock_disponible_mes")).scalar()
+    assert total == 2
+
+
+def test_importar_stock_primera_fila_corta(stock_db):
+    # Filas regulares suficientes para que csv.Sniffer tolere la corta.
+    contenido = "stock_disponible,notas,producto_codigo\n" + "1,x\n" + "2,x,A1\n" * 30
+
+    result = importar_stock_csv_o_excel(stock_db, 2024, 5, _csv(contenido), "2024-05-31")
+
+    assert (result.insertados, result.actualizados, result.rechazados) == (1, 29, 1)
+    assert result.errores == ["Fila 2: producto_codigo vacío"]
+
+
+@pytest.mark.parametrize(
+    "guardado, en_archivo",
+    [("ÑANDÚ-1", "nandu-1"), ("F6  ", "f6"), ("G7", "g7  ")],
+)
+def test_importar_stock_codigo_segun_collation(stock_db, guardado, en_archivo):
+    stock_db.execute(
+        text("INSERT INTO producto VALUES (6, :c, 'Producto', 1)"), {"c": guardado}
+    )
+    contenido = f"producto_codigo;stock_disponible\n{en_archivo};7\n"
+
+    result = importar_stock_csv_o_excel(stock_db, 2024, 5, _csv(contenido), "2024-05-31")
+
+    assert (result.insertados, result.rechazados) == (1, 0)
+    assert _stock(stock_db) == {6: 7.0}
+
+
+def test_importar_stock_xlsx_rechaza_booleanos(stock_db):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["producto_codigo", "stock_disponible"])
+    ws.append(["A1", True])
+    ws.append(["B2", 4])
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+
+    result = importar_stock_csv_o_excel(
+        stock_db, 2024, 5, UploadFile(file=buf, filename="s.xlsx"), "2024-05-31"
+    )
+
+    assert (result.insertados, result.rechazados) == (1, 1)
+    assert _stock(stock_db) == {2: 4.0}
+
+
+def test_listar_stock_keyset_recorre_todo_sin_repetir(stock_db):
+    for sid, pid in enumerate([3, 1, 5, 2, 4, 1], start=1):
+        stock_db.execute(
+            text(
+                "INSERT INTO stock_disponible_mes VALUES "
+                "(:id, 2024, 5, :pid, 1, '2024-05-31', 'ERP_FLEXXUS')"
+            ),
+            {"id": sid, "pid": pid},
+        )
+
+    completo = listar_stock_periodo(stock_db, 2024, 5, None)
+    paginas, after = [], None
+    while True:
+        pagina = listar_stock_periodo(stock_db, 2024, 5, None, limit=4, after=after)
+        if not pagina:
+            break
+        paginas.extend(pagina)
+        after = (pagina[-1].producto_codigo, pagina[-1].id)
+
+    assert [(s.producto_codigo, s.id) for s in completo] == [
+        ("A1", 2), ("A1", 6), ("B2", 4), ("C3", 1), ("D4", 5), ("E5", 3)
+    ]
+    assert paginas == completo
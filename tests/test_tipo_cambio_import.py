@@ -0,0 +1,165 @@
+import csv
+import io
+import re
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from app.schemas.tipo_cambio import TipoCambioFiltro
+from app.services import tipo_cambio_service
+from app.services.tipo_cambio_service import (
+    bulk_import_csv,
+    listar_tipos_cambio,
+    upsert_tipos_cambio,
+)
+
+
+def _bulk_import_csv_dictreader(contenido: str):
+    """Parseo anterior (csv/DictReader fila a fila): (filas, líneas con error)."""
+    normalized = contenido.replace(";", ",")
+    filas, errores = [], []
+    first = next(csv.reader(io.StringIO(normalized)), None)
+    if first is None:
+        return filas, errores
+    if any(h.lower() in ("fecha", "tasa") for h in first):
+        reader = enumerate(csv.DictReader(io.StringIO(normalized)), start=2)
+        for idx, row in reader:
+            fecha = row.get("fecha") or row.get("Fecha")
+            tasa = row.get("tasa") or row.get("Tasa")
+            if not fecha or not tasa:
+                errores.append(idx)
+                continue
+            try:
+                valor = float(tasa.strip())
+                if not valor > 0:
+                    raise ValueError
+                filas.append((date.fromisoformat(fecha.strip()), valor))
+            except ValueError:
+                errores.append(idx)
+    else:
+        for idx, cols in enumerate(csv.reader(io.StringIO(normalized)), start=1):
+            if len(cols) < 2:
+                continue
+            try:
+                valor = float(cols[1].strip())
+                if not valor > 0:
+                    raise ValueError
+                filas.append((date.fromisoformat(cols[0].strip()), valor))
+            except ValueError:
+                errores.append(idx)
+    return filas, errores
+
+
+@pytest.mark.parametrize(
+    "contenido",
+    [
+        "2024-01-02,1000.5\n2024-01-03;1001\n\n2024-01-04,\n,5\nfoo\n"
+        " 2024-01-05 , 1002 \n2024-02-30,1\n2024-01-06,0\n2024-01-07,-3\n",
+        "fecha,tasa\n2024-01-02,1000.5\n2024-01-03,\n2024-01-04,abc\n"
+        "2024-01-05,1002\n2024-01-06\n",
+        "Tasa;Fecha;Notas\n1000,5;2024-01-02;x\n1001;2024-01-03\n;2024-01-04\n",
+        "fecha,tasa\n\"2024-01-02\",\"1000.5\"\n",
+        # dígitos no ASCII: quedan fuera del camino rápido
+        "2024-01-0\u0663,1000\n\uff12\uff10\uff12\uff14-01-02,\u0661\u0660\n",
+    ],
+)
+def test_bulk_import_csv_igual_a_dictreader(monkeypatch, contenido):
+    capturadas = []
+    monkeypatch.setattr(
+        tipo_cambio_service,
+        "upsert_tipos_cambio",
+        lambda conn, rows: capturadas.extend(rows) or (len(rows), 0),
+    )
+
+    _, _, errores = bulk_import_csv(None, contenido)
+
+    filas, lineas_error = _bulk_import_csv_dictreader(contenido)
+    assert [(r["fecha"], r["tasa"]) for r in capturadas] == filas
+    assert [int(re.match(r"Línea (\d+)", e).group(1)) for e in errores] == lineas_error
+
+
+class _FakeConn:
+    """Conexión mínima con la tabla tipo_cambio_hist en memoria."""
+
+    def __init__(self, claves=()):
+        self.tabla = {clave: None for clave in claves}
+        self.lotes = []
+
+    def execute(self, stmt, params):
+        if stmt is tipo_cambio_service.SQL_CLAVES_EXISTENTES:
+            return [
+                SimpleNamespace(moneda=m, fecha=f, tipo=t)
+                for (m, f, t) in self.tabla
+                if m in params["monedas"]
+                and t in params["tipos"]
+                and params["desde"] <= f <= params["hasta"]
+            ]
+        assert stmt is tipo_cambio_service.SQL_UPSERT_TIPO_CAMBIO
+        self.lotes.append(len(params))
+        for r in params:
+            self.tabla[(r["moneda"], r["fecha"], r["tipo"])] = r["tasa"]
+
+
+def _fila(dia, tasa, moneda="USD"):
+    return {
+        "fecha": date(2024, 1, dia),
+        "moneda": moneda,
+        "tipo": "VENTA",
+        "tasa": tasa,
+        "origen": "MANUAL",
+        "notas": None,
+    }
+
+
+def test_upsert_tipos_cambio_cuenta_por_lotes():
+    conn = _FakeConn(claves=[("USD", date(2024, 1, 2), "VENTA")])
+    rows = [
+        _fila(1, 10.0),
+        _fila(2, 11.0),  # ya existía
+        _fila(3, 12.0),
+        _fila(3, 12.5),  # repetida dentro del lote
+        _fila(1, 13.0),  # repetida en otro lote
+        _fila(1, 14.0, moneda="EUR"),
+    ]
+
+    assert upsert_tipos_cambio(conn, rows, chunk=4) == (3, 3)
+    assert conn.lotes == [4, 2]
+    assert conn.tabla[("USD", date(2024, 1, 1), "VENTA")] == 13.0
+    assert len(conn.tabla) == 4
+
+
+def test_listar_tipos_cambio_keyset_recorre_todo_sin_repetir(sqlite_db):
+    sqlite_db.execute(
+        text(
+            "CREATE TABLE tipo_cambio_hist (id INTEGER PRIMARY KEY, fecha DATE, "
+            "moneda TEXT, tipo TEXT, tasa REAL, origen TEXT, notas TEXT, "
+            "fecha_creacion TIMESTAMP)"
+        )
+    )
+    for i, dia in enumerate([2, 1, 2, 3, 1, 2, 3], start=1):
+        sqlite_db.execute(
+            text(
+                "INSERT INTO tipo_cambio_hist VALUES "
+                "(:id, :f, 'USD', 'VENTA', :t, 'MANUAL', NULL, NULL)"
+            ),
+            {"id": i, "f": date(2024, 1, dia), "t": float(i)},
+        )
+
+    completo = listar_tipos_cambio(sqlite_db, TipoCambioFiltro(moneda="USD"))
+    paginas, cursor = [], {}
+    while True:
+        pagina = listar_tipos_cambio(
+            sqlite_db, TipoCambioFiltro(moneda="USD", limit=3, **cursor)
+        )
+        if not pagina:
+            break
+        paginas.extend(pagina)
+        cursor = {
+            "cursor_fecha": date.fromisoformat(pagina[-1]["fecha"]),
+            "cursor_id": pagina[-1]["id"],
+        }
+
+    assert [r["id"] for r in completo] == [7, 4, 6, 3, 1, 5, 2]
+    assert paginas == completo
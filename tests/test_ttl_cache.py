@@ -0,0 +1,54 @@
+from app.utils import ttl_cache
+from app.utils.ttl_cache import TTLCache
+
+
+class _Reloj:
+    def __init__(self):
+        self.ahora = 100.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_ttl_cache_expira(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", reloj)
+    cache = TTLCache(maxsize=4, ttl=30)
+
+    cache.set("k", [1])
+    reloj.ahora += 29
+    assert cache.get("k") == [1]
+    reloj.ahora += 2
+    assert cache.get("k") is None
+
+
+def test_ttl_cache_clear_y_pop():
+    cache = TTLCache(maxsize=4, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.pop("a")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    cache.clear()
+    assert cache.get("b") is None
+
+
+def test_ttl_cache_descarta_vencidas_y_luego_la_mas_vieja(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", reloj)
+    cache = TTLCache(maxsize=2, ttl=10)
+
+    cache.set("vieja", 1)
+    reloj.ahora += 5
+    cache.set("nueva", 2)
+    cache.set("tercera", 3)  # sin vencidas: sale la más vieja
+    assert cache.get("vieja") is None
+    assert cache.get("nueva") == 2
+
+    reloj.ahora += 6  # vence "nueva"
+    cache.set("cuarta", 4)
+    assert cache.get("nueva") is None
+    assert cache.get("tercera") == 3
+    assert cache.get("cuarta") == 4